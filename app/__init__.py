@@ -1,6 +1,6 @@
-from flask import Flask, send_from_directory
+from flask import Flask
 from config import config
-from app.database import db
+from app.database import db, async_db, configure_engines, init_read_routing
 
 import os
 
@@ -10,26 +10,122 @@ def create_app(config_name='default'):
     template_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'templates'))
     static_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'static'))
     app = Flask(__name__, template_folder=template_dir, static_folder=static_dir)
+
+    # 使用較快的 JSON 序列化
+    from app.utils.json_provider import FastJSONProvider
+    app.json = FastJSONProvider(app)
     
     # 加載配置
     app.config.from_object(config[config_name])
+
+    # 在反向代理之後時，依信任的層數從 X-Forwarded-* 取得客戶端 IP 與協定
+    proxy_hops = {
+        option: app.config[f'PROXY_FIX_{option.upper()}'] for option in ('x_for', 'x_proto', 'x_host')
+    }
+    if any(proxy_hops.values()):
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(app.wsgi_app, **proxy_hops)
     
     # 初始化擴展
     db.init_app(app)
+    configure_engines(app)
+    init_read_routing(app)
+
+    from app.services.image_queue import image_queue
+    from app.services.user_cache import user_cache
+    from app.services.password_hasher import password_hasher
+    from app.services.contact_buffer import contact_buffer
+    from app.services.metrics import metrics
+    from app.services.admission import admission
+    from app.services.api_tokens import api_tokens
+    metrics.init_app(app)
+    admission.init_app(app)
+    async_db.init_app(app)
+    if async_db.enabled and metrics.enabled:
+        metrics.instrument_engine(async_db.engine.sync_engine)
+    image_queue.init_app(app)
+    user_cache.init_app(app)
+    password_hasher.init_app(app)
+    contact_buffer.init_app(app)
+    api_tokens.init_app(app)
     
     # 註冊藍圖
     from app.views import register_blueprints
     register_blueprints(app)
     
-    # 創建資料庫表格
-    with app.app_context():
-        db.create_all()
+    # 註冊資料庫遷移與全文檢索命令
+    from app.migrations import db_upgrade_command, upgrade_database
+    from app.services.search_service import search_rebuild_command
+    app.cli.add_command(db_upgrade_command)
+    app.cli.add_command(search_rebuild_command)
+
+    # 創建資料庫表格並套用遷移（只在 AUTO_MIGRATE 時，正式環境由 flask db-upgrade 執行）
+    if app.config['AUTO_MIGRATE']:
+        with app.app_context():
+            db.create_all()
+            upgrade_database()
 
     app.config['MAX_CONTENT_LENGTH'] = config[config_name].MAX_CONTENT_LENGTH
+
+    # 清理上次中斷時殘留的上傳暫存檔
+    from app.utils.file_helpers import sweep_temp_files
+    sweep_temp_files(
+        [app.config['UPLOAD_FOLDER'], app.config['AVATAR_FOLDER']],
+        app.config['UPLOAD_TEMP_MAX_AGE']
+    )
     
-    # 添加上傳文件的靜態文件服務
-    @app.route('/uploads/<path:filename>')
-    def uploaded_file(filename):
-        return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+    # 靜態文件網址加上內容雜湊，並回應永久快取標頭
+    from app.utils.static_files import register_static_versioning
+    register_static_versioning(app)
+
+    # 依 Accept-Encoding 壓縮響應
+    from app.utils.compression import init_compression
+    init_compression(app)
     
-    return app
\ No newline at end of file
+    return app
+
+
+def create_asgi_app(config_name='default'):
+    """
+    以 ASGI 伺服器執行（uvicorn asgi:application）
+    - 連線與請求本文的接收由事件迴圈處理，慢速上傳不會佔用執行緒
+    - 收完本文後才交給執行緒池執行 Flask（數量由 ASGI_THREADS 環境變數決定）
+    - /api/async 端點在請求內以 await 等待資料庫與檔案 I/O
+    """
+    from asgiref.wsgi import WsgiToAsgi
+    return WsgiToAsgi(create_app(config_name))
+
+
+def preload(app, workers=1):
+    """
+    在 master 行程預先載入（gunicorn preload_app），fork 出的 worker 以 copy-on-write 共用
+    - 多個 worker 時確認權杖 denylist 與圖片工作狀態為共用的後端（用戶快取未共用時只記錄警告）
+    - 載入延遲匯入的模組（Pillow、行程池）
+    - 預先計算靜態文件雜湊
+    - 凍結目前的物件，避免 GC 更新物件標頭而複製共用的記憶體分頁
+    """
+    import gc
+    import concurrent.futures.process
+    from PIL import Image
+    from app.utils.static_files import file_hash
+    from app.services.api_tokens import api_tokens
+    from app.services.image_queue import image_queue
+    from app.services.user_cache import user_cache
+
+    api_tokens.check_workers(workers)
+    image_queue.check_workers(workers)
+    user_cache.check_workers(workers)
+    Image.init()
+    for root, _, files in os.walk(app.static_folder):
+        for name in files:
+            file_hash(os.path.join(root, name))
+    gc.freeze()
+
+
+def after_fork(app):
+    """worker fork 後重設不能跨行程共用的資源（資料庫連線）"""
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+    if async_db.enabled:
+        async_db.engine.sync_engine.dispose(close=False)
@@ -1,3 +1,184 @@
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from flask import current_app, g, has_request_context, request
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
 
-db = SQLAlchemy()
\ No newline at end of file
+# 唯讀請求的方法
+READ_ONLY_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+
+# 寫入後讓同一客戶端在一段時間內讀主庫的 cookie
+STICKY_COOKIE = 'db_primary_until'
+
+# 強制指定路由：'replica'、'primary' 或 None（依請求決定）
+_route_override = ContextVar('db_route_override', default=None)
+
+
+class RoutingSession(Session):
+    """
+    讀寫分離的 Session
+    - 唯讀請求中的 SELECT 送到 DB_REPLICAS 中的一個副本
+    - flush、INSERT/UPDATE/DELETE 與其他語句一律送到主庫
+    - 請求中一旦寫入，後續讀取也改用主庫
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            key = self._replica_key(clause)
+            if key is not None:
+                return self._db.engines[key]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _replica_key(self, clause):
+        """決定這次查詢要用的副本，None 表示主庫"""
+        is_select = clause is not None and getattr(clause, 'is_select', False)
+        in_request = has_request_context()
+        if in_request and (self._flushing or not is_select):
+            g.db_wrote = True
+
+        override = _route_override.get()
+        if override == 'primary' or self._flushing or not is_select:
+            return None
+        if override != 'replica' and not (in_request and g.get('db_read_only')):
+            return None
+        if in_request and g.get('db_wrote'):
+            return None
+
+        replicas = current_app.config['DB_REPLICAS']
+        if not replicas:
+            return None
+        if not in_request:
+            return random.choice(replicas)
+        # 同一個請求固定使用同一個副本
+        if 'db_replica' not in g:
+            g.db_replica = random.choice(replicas)
+        return g.db_replica
+
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+@contextmanager
+def read_replica():
+    """區塊內的 SELECT 使用副本（請求中已寫入或在黏主庫期間仍用主庫）"""
+    token = _route_override.set('replica')
+    try:
+        yield
+    finally:
+        _route_override.reset(token)
+
+@contextmanager
+def primary():
+    """區塊內的查詢一律使用主庫"""
+    token = _route_override.set('primary')
+    try:
+        yield
+    finally:
+        _route_override.reset(token)
+
+def init_read_routing(app):
+    """註冊請求層級的讀寫分離：唯讀請求讀副本，寫入後的短時間內同一客戶端讀主庫"""
+    if not app.config['DB_REPLICAS']:
+        return
+
+    @app.before_request
+    def mark_read_only():
+        sticky_until = request.cookies.get(STICKY_COOKIE, type=float) or 0
+        g.db_read_only = request.method in READ_ONLY_METHODS and sticky_until < time.time()
+
+    @app.after_request
+    def stick_to_primary(response):
+        if g.get('db_wrote'):
+            seconds = app.config['REPLICA_STICKY_SECONDS']
+            response.set_cookie(STICKY_COOKIE, str(time.time() + seconds), max_age=seconds, httponly=True)
+        return response
+
+def _apply_sqlite_pragmas(pragmas):
+    """建立每個新連線時執行的 PRAGMA"""
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+    return on_connect
+
+def configure_engines(app):
+    """依配置調整資料庫引擎（目前為 SQLite 的 SQLITE_PRAGMAS）"""
+    pragmas = app.config.get('SQLITE_PRAGMAS')
+    if not pragmas:
+        return
+
+    with app.app_context():
+        for engine in db.engines.values():
+            if engine.dialect.name == 'sqlite':
+                event.listen(engine, 'connect', _apply_sqlite_pragmas(pragmas))
+
+
+# 同步驅動對應的 asyncio 驅動（需要 pip install flask-demo[async]）
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg',
+}
+
+
+def async_database_url(url):
+    """把同步連線字串轉成 asyncio 驅動的連線字串"""
+    from sqlalchemy.engine import make_url
+
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"沒有 {backend} 的 asyncio 驅動，請設定 ASYNC_DATABASE_URL")
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+
+class AsyncDatabase:
+    """
+    與 db 並存的 asyncio Session，供非同步視圖使用（共用相同的模型）
+    - ASYNC_ENABLED 為 True 時才建立引擎
+    - Flask 的非同步視圖每個請求都在新的事件迴圈中執行，asyncpg 等驅動的連線綁定在迴圈上無法共用，
+      因此除了 aiosqlite（連線在自己的執行緒中執行）以外都使用 NullPool；PostgreSQL 部署請在前面放 PgBouncer
+    - 一律連線主庫，不經過讀寫分離
+    """
+
+    def __init__(self, app=None):
+        self.engine = None
+        self.session_factory = None
+        if app is not None:
+            self.init_app(app)
+
+    @property
+    def enabled(self):
+        return self.engine is not None
+
+    def init_app(self, app):
+        """綁定應用並建立 asyncio 引擎"""
+        self.engine = None
+        self.session_factory = None
+        app.extensions['async_db'] = self
+        if not app.config['ASYNC_ENABLED']:
+            return
+
+        from sqlalchemy.engine import make_url
+        from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+        from sqlalchemy.pool import NullPool
+
+        url = app.config['ASYNC_DATABASE_URL'] or async_database_url(app.config['SQLALCHEMY_DATABASE_URI'])
+        options = {} if make_url(url).get_backend_name() == 'sqlite' else {'poolclass': NullPool}
+        self.engine = create_async_engine(url, **options)
+        pragmas = app.config.get('SQLITE_PRAGMAS')
+        if pragmas and self.engine.dialect.name == 'sqlite':
+            event.listen(self.engine.sync_engine, 'connect', _apply_sqlite_pragmas(pragmas))
+        # commit 後仍可讀取屬性（非同步環境不能延遲載入）
+        self.session_factory = async_sessionmaker(self.engine, expire_on_commit=False)
+
+    def session(self):
+        """async with async_db.session() as session: ..."""
+        if self.session_factory is None:
+            raise RuntimeError("未啟用非同步模式（ASYNC_ENABLED）")
+        return self.session_factory()
+
+
+async_db = AsyncDatabase()
@@ -0,0 +1,125 @@
+from datetime import datetime
+import click
+from sqlalchemy import text, inspect
+from app.database import db
+
+
+def add_column(table, column, ddl):
+    """
+    新增欄位的遷移步驟（欄位已存在時略過）
+    新資料庫的欄位已由 db.create_all() 依模型建立，SQLite 也不支援 ADD COLUMN IF NOT EXISTS
+    """
+    def step(conn):
+        if column in {col['name'] for col in inspect(conn).get_columns(table)}:
+            return
+        conn.execute(text(f'ALTER TABLE "{table}" ADD COLUMN {column} {ddl}'))
+    return step
+
+
+# 版本化的資料庫遷移：(版本號, 說明, SQL語句列表)
+# 語句也可以是 {方言名稱: [SQL語句]}，未列出的方言略過（'default' 為預設）
+# 語句也可以是接收連線的函數，用於需要先檢查結構的步驟
+# 新的結構變更只能往後追加，已發佈的版本不可修改
+MIGRATIONS = [
+    (1, "新增訊息與信箱的查詢索引", [
+        'CREATE INDEX IF NOT EXISTS ix_contact_message_user_id_created_at '
+        'ON contact_message (user_id, created_at)',
+        'CREATE INDEX IF NOT EXISTS ix_contact_message_created_at '
+        'ON contact_message (created_at)',
+        'CREATE INDEX IF NOT EXISTS ix_user_email_lower '
+        'ON "user" (lower(email))',
+    ]),
+    (2, "新增聯絡訊息全文檢索", {
+        # trigram 分詞可以搜尋中文等不以空白分詞的文字
+        'sqlite': [
+            "CREATE VIRTUAL TABLE IF NOT EXISTS contact_message_fts USING fts5("
+            "name, email, message, content='contact_message', content_rowid='id', tokenize='trigram')",
+            "CREATE TRIGGER IF NOT EXISTS contact_message_fts_ai AFTER INSERT ON contact_message BEGIN "
+            "INSERT INTO contact_message_fts(rowid, name, email, message) "
+            "VALUES (new.id, new.name, new.email, new.message); END",
+            "CREATE TRIGGER IF NOT EXISTS contact_message_fts_ad AFTER DELETE ON contact_message BEGIN "
+            "INSERT INTO contact_message_fts(contact_message_fts, rowid, name, email, message) "
+            "VALUES ('delete', old.id, old.name, old.email, old.message); END",
+            "CREATE TRIGGER IF NOT EXISTS contact_message_fts_au AFTER UPDATE ON contact_message BEGIN "
+            "INSERT INTO contact_message_fts(contact_message_fts, rowid, name, email, message) "
+            "VALUES ('delete', old.id, old.name, old.email, old.message); "
+            "INSERT INTO contact_message_fts(rowid, name, email, message) "
+            "VALUES (new.id, new.name, new.email, new.message); END",
+            "INSERT INTO contact_message_fts(contact_message_fts) VALUES ('rebuild')",
+        ],
+        # 表達式索引由 PostgreSQL 自動維護
+        'postgresql': [
+            "CREATE INDEX IF NOT EXISTS ix_contact_message_fts ON contact_message USING GIN ("
+            "to_tsvector('simple', name || ' ' || email || ' ' || message))",
+        ],
+    }),
+    (3, "新增 updated_at 變更追蹤欄位（ETag 使用）", [
+        add_column('user', 'updated_at', 'TIMESTAMP'),
+        add_column('contact_message', 'updated_at', 'TIMESTAMP'),
+        'UPDATE "user" SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP) WHERE updated_at IS NULL',
+        'UPDATE contact_message SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP) '
+        'WHERE updated_at IS NULL',
+        'CREATE INDEX IF NOT EXISTS ix_user_updated_at ON "user" (updated_at)',
+        'CREATE INDEX IF NOT EXISTS ix_contact_message_updated_at ON contact_message (updated_at)',
+    ]),
+    (4, "新增依用戶按 id 排序的訊息索引", [
+        'CREATE INDEX IF NOT EXISTS ix_contact_message_user_id_id ON contact_message (user_id, id)',
+    ]),
+]
+
+
+def _ensure_version_table(conn):
+    """確保版本記錄表存在"""
+    conn.execute(text(
+        'CREATE TABLE IF NOT EXISTS schema_version ('
+        'version INTEGER PRIMARY KEY, '
+        'description VARCHAR(200) NOT NULL, '
+        'applied_at TIMESTAMP NOT NULL)'
+    ))
+
+
+def current_version():
+    """取得目前資料庫的結構版本"""
+    with db.engine.begin() as conn:
+        _ensure_version_table(conn)
+        return conn.execute(text('SELECT MAX(version) FROM schema_version')).scalar() or 0
+
+
+def upgrade_database():
+    """
+    套用所有尚未執行的遷移
+    :return: 本次套用的版本號列表
+    """
+    applied = []
+    version = current_version()
+    dialect = db.engine.dialect.name
+    for number, description, statements in MIGRATIONS:
+        if number <= version:
+            continue
+        if isinstance(statements, dict):
+            statements = statements.get(dialect, statements.get('default', []))
+        # 每個版本在同一個交易內完成
+        with db.engine.begin() as conn:
+            for statement in statements:
+                if callable(statement):
+                    statement(conn)
+                else:
+                    conn.execute(text(statement))
+            conn.execute(
+                text('INSERT INTO schema_version (version, description, applied_at) '
+                     'VALUES (:version, :description, :applied_at)'),
+                {"version": number, "description": description, "applied_at": datetime.utcnow()}
+            )
+        applied.append(number)
+    return applied
+
+
+@click.command('db-upgrade')
+def db_upgrade_command():
+    """建立資料表並套用尚未執行的遷移"""
+    db.create_all()
+    applied = upgrade_database()
+    if applied:
+        click.echo(f"✅ 已套用遷移版本: {', '.join(str(v) for v in applied)}")
+    else:
+        click.echo(f"✅ 資料庫已是最新版本 (v{current_version()})")
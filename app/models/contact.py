@@ -2,11 +2,29 @@ from datetime import datetime
 from app.database import db
 
 class ContactMessage(db.Model):
+    __table_args__ = (
+        # 依用戶查詢並按時間排序（訊息頁依 (created_at, id) 分頁，SQLite 索引最後隱含 id）
+        db.Index('ix_contact_message_user_id_created_at', 'user_id', 'created_at'),
+        # 依用戶查詢並按 id 排序：user.messages、每位用戶最新的訊息、依用戶計數
+        db.Index('ix_contact_message_user_id_id', 'user_id', 'id'),
+        # 依日期區間查詢
+        db.Index('ix_contact_message_created_at', 'created_at'),
+        # 列表的集合 ETag 需要 max(updated_at)
+        db.Index('ix_contact_message_updated_at', 'updated_at'),
+    )
+
+    # API 可選欄位（?fields=）與各自需要查詢的資料表欄位
+    API_FIELDS = {
+        field: (field,) for field in ("id", "name", "email", "message", "created_at", "updated_at", "user_id")
+    }
+
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(80), nullable=False)
     email = db.Column(db.String(120), nullable=False)
     message = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # 每次更新都會變動，用於 ETag
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # 關聯：關聯到用戶
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
@@ -21,6 +39,12 @@ class ContactMessage(db.Model):
             "name": self.name,
             "email": self.email,
             "message": self.message,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
             "user_id": self.user_id
-        }
\ No newline at end of file
+        }
+
+    @classmethod
+    def serialize_row(cls, row, fields):
+        """將欄位投影查詢的資料列轉換為字典，只輸出要求的欄位"""
+        return {field: getattr(row, field) for field in fields}
@@ -1,6 +1,7 @@
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask import current_app
 from app.database import db
+from app.services.password_hasher import password_hasher
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -8,18 +9,58 @@ class User(db.Model):
     email = db.Column(db.String(120), unique=True, nullable=False)
     password_hash = db.Column(db.String(120), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # 每次更新都會變動，用於 ETag
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     avatar_filename = db.Column(db.String(120), nullable=True)
     
-    # 關聯：一個用戶可以有多個訊息
-    messages = db.relationship('ContactMessage', backref='user', lazy=True)
+    # 關聯：一個用戶可以有多個訊息（由新到舊）
+    # 批次讀取多位用戶的訊息請用 selectinload 或 ContactService.attach_recent_messages，避免 N+1 查詢
+    messages = db.relationship(
+        'ContactMessage', backref='user', lazy=True, order_by='ContactMessage.id.desc()'
+    )
+
+    # API 可選欄位（?fields=）與各自需要查詢的資料表欄位
+    API_FIELDS = {
+        "id": ("id",),
+        "username": ("username",),
+        "email": ("email",),
+        "created_at": ("created_at",),
+        "updated_at": ("updated_at",),
+        "avatar_url": ("avatar_filename",),
+        "avatar_urls": ("avatar_filename",),
+    }
+
+    __table_args__ = (
+        # 不區分大小寫的信箱查詢
+        db.Index('ix_user_email_lower', db.func.lower(email)),
+        # 列表的集合 ETag 需要 max(updated_at)
+        db.Index('ix_user_updated_at', 'updated_at'),
+    )
+
+    @classmethod
+    def find_by_email(cls, email):
+        """依信箱查找用戶（不區分大小寫，使用 lower(email) 索引），非字串時回傳 None"""
+        if not isinstance(email, str):
+            return None
+        return cls.query.filter(db.func.lower(cls.email) == email.lower()).first()
 
     def set_password(self, password):
         """設置密碼雜湊"""
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
     
     def check_password(self, password):
         """檢查密碼是否正確"""
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.verify(self.password_hash, password)
+    
+    def rehash_password_if_needed(self, password):
+        """
+        密碼驗證成功後，若雜湊使用舊參數則以目前配置重新雜湊
+        :return: 是否有更新（呼叫者需要 commit）
+        """
+        if not password_hasher.needs_rehash(self.password_hash):
+            return False
+        self.set_password(password)
+        return True
     
     def __repr__(self):
         return f"<User {self.username}>"
@@ -30,13 +71,50 @@ class User(db.Model):
             "id": self.id,
             "username": self.username,
             "email": self.email,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "avatar_url": self.get_avatar_url()
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "avatar_url": self.get_avatar_url(),
+            "avatar_urls": {
+                str(size): self.get_avatar_url(size)
+                for size in current_app.config['AVATAR_RENDITION_SIZES']
+            }
         }
     
-    def get_avatar_url(self):
-        """獲取頭像URL"""
-        if self.avatar_filename:
-            return f"/uploads/avatars/{self.avatar_filename}"
-        return "/static/images/default_avatar.png" # 預設頭像
-    
\ No newline at end of file
+    @classmethod
+    def serialize_row(cls, row, fields):
+        """將欄位投影查詢的資料列轉換為字典，只輸出要求的欄位"""
+        data = {}
+        for field in fields:
+            if field == "avatar_url":
+                data[field] = cls.avatar_url_for(row.avatar_filename)
+            elif field == "avatar_urls":
+                data[field] = {
+                    str(size): cls.avatar_url_for(row.avatar_filename, size)
+                    for size in current_app.config['AVATAR_RENDITION_SIZES']
+                }
+            else:
+                data[field] = getattr(row, field)
+        return data
+
+    def get_avatar_url(self, size=None):
+        """
+        獲取頭像URL
+        :param size: 需要的邊長（px），會取不小於它的最接近尺寸，預設為 AVATAR_SIZE
+        """
+        return self.avatar_url_for(self.avatar_filename, size)
+
+    @staticmethod
+    def avatar_url_for(avatar_filename, size=None):
+        """依頭像檔名產生URL（不需要載入完整的 User）"""
+        if not avatar_filename:
+            return "/static/images/default_avatar.png" # 預設頭像
+
+        # 舊版頭像只有單一尺寸
+        if '.' in avatar_filename:
+            return f"/uploads/avatars/{avatar_filename}"
+
+        sizes = sorted(current_app.config['AVATAR_RENDITION_SIZES'])
+        size = size or current_app.config['AVATAR_SIZE'][0]
+        rendition = next((s for s in sizes if s >= size), sizes[-1])
+        # 一律回傳 JPEG 網址，支援 WebP 的客戶端由 /uploads 依 Accept 提供
+        return f"/uploads/avatars/{avatar_filename}_{rendition}.jpg"
@@ -0,0 +1,205 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, g, request
+from app.services.metrics import metrics
+from app.services.api_tokens import api_tokens, InvalidToken
+from app.utils.json_provider import dumps_bytes
+
+
+class ConcurrencyLimiter:
+    """
+    一類端點的並行上限
+    - 同時執行數達到 concurrency 時，最多 queue_size 個請求排隊等待
+    - 排隊超過 queue_timeout 秒或佇列已滿時立即拒絕
+    """
+
+    def __init__(self, concurrency, queue_size, queue_timeout):
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiting = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        """取得執行名額，失敗時回傳 False"""
+        with self._condition:
+            if self.active < self.concurrency:
+                self.active += 1
+                return True
+            if self.waiting >= self.queue_size:
+                return False
+
+            self.waiting += 1
+            try:
+                deadline = time.monotonic() + self.queue_timeout
+                while self.active >= self.concurrency:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    self._condition.wait(remaining)
+                self.active += 1
+                return True
+            finally:
+                self.waiting -= 1
+
+    def release(self):
+        with self._condition:
+            self.active -= 1
+            self._condition.notify()
+
+
+class TokenBuckets:
+    """
+    每個 key（IP 或用戶）一個權杖桶
+    只保留最近使用的 max_keys 個桶，記憶體用量固定
+    """
+
+    def __init__(self, rate, burst, max_keys=100000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key):
+        """
+        取用一個權杖
+        :return: (是否允許, 需要等待的秒數)
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, 0 if allowed else (1 - tokens) / self.rate
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class AdmissionControl:
+    """
+    昂貴端點的准入控制（ADMISSION_CLASSES）
+    - 每類端點有並行上限與有上限的排隊，過載時回 503
+    - 每個 IP 或用戶有權杖桶速率限制，超過時回 429
+    - 未列入任何類別的端點不受影響，過載時便宜的請求仍能維持低延遲
+    - 限制只在本行程內有效，多行程部署時為每個 worker 各自的上限
+    """
+
+    def __init__(self, app=None):
+        self.classes = {}
+        self._endpoints = {}
+        self._limiters = {}
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._stats = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """綁定應用並註冊請求鉤子"""
+        self.classes = app.config['ADMISSION_CLASSES']
+        self._endpoints = {
+            endpoint: name for name, options in self.classes.items() for endpoint in options['endpoints']
+        }
+        self._limiters = {}
+        self._buckets = {}
+        self._stats = {name: {"admitted": 0, "overloaded": 0, "rate_limited": 0} for name in self.classes}
+        if app.config['ADMISSION_ENABLED']:
+            self._limiters = {
+                name: ConcurrencyLimiter(options['concurrency'], options['queue'], options['queue_timeout'])
+                for name, options in self.classes.items()
+            }
+        if app.config['RATE_LIMIT_ENABLED']:
+            self._buckets = {
+                name: TokenBuckets(options['rate'], options['burst'], app.config['RATE_LIMIT_MAX_KEYS'])
+                for name, options in self.classes.items() if options.get('rate')
+            }
+        app.extensions['admission'] = self
+        app.before_request(self._before_request)
+        app.teardown_request(self._teardown_request)
+
+    def _count(self, name, key):
+        with self._lock:
+            self._stats[name][key] += 1
+
+    @staticmethod
+    def _client_key(options):
+        """
+        速率限制的對象：'user' 使用已驗證的用戶 id（不取路由中的 user_id，未登入者不能耗盡他人的額度），
+        未認證或認證失敗時退回 IP（代理之後需設定 PROXY_FIX_X_FOR）
+        """
+        if options.get('key') == 'user':
+            try:
+                return f"user:{api_tokens.authenticate()}"
+            except InvalidToken:
+                pass
+        return f"ip:{request.remote_addr}"
+
+    @staticmethod
+    def _reject(status_code, message, retry_after):
+        """與 API error_response 相同格式的拒絕響應"""
+        response = current_app.response_class(
+            dumps_bytes({"success": False, "message": message, "errors": None}),
+            status=status_code, mimetype='application/json',
+        )
+        response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+        return response
+
+    def _before_request(self):
+        name = self._endpoints.get(request.endpoint)
+        if name is None:
+            return None
+        options = self.classes[name]
+        if request.method not in options.get('methods', ('POST', 'PUT', 'DELETE')):
+            return None
+
+        buckets = self._buckets.get(name)
+        if buckets is not None:
+            allowed, wait = buckets.consume(self._client_key(options))
+            if not allowed:
+                self._count(name, "rate_limited")
+                if metrics.enabled:
+                    metrics.admission_rejections.inc(1, name, 'rate_limited')
+                return self._reject(429, "請求過於頻繁，請稍後再試", wait)
+
+        limiter = self._limiters.get(name)
+        if limiter is not None:
+            if not limiter.acquire():
+                self._count(name, "overloaded")
+                if metrics.enabled:
+                    metrics.admission_rejections.inc(1, name, 'overloaded')
+                return self._reject(503, "服務忙碌中，請稍後再試", options['retry_after'])
+            g.admission_limiter = limiter
+
+        self._count(name, "admitted")
+        return None
+
+    def _teardown_request(self, exc):
+        limiter = g.pop('admission_limiter', None)
+        if limiter is not None:
+            limiter.release()
+
+    def stats(self):
+        """各類別的目前狀態與累計次數"""
+        with self._lock:
+            stats = {name: dict(counts) for name, counts in self._stats.items()}
+        for name, counts in stats.items():
+            limiter = self._limiters.get(name)
+            if limiter is not None:
+                counts.update(active=limiter.active, waiting=limiter.waiting, concurrency=limiter.concurrency)
+            buckets = self._buckets.get(name)
+            if buckets is not None:
+                counts["tracked_clients"] = len(buckets)
+        return stats
+
+
+admission = AdmissionControl()
@@ -0,0 +1,288 @@
+import base64
+import hashlib
+import hmac
+import inspect
+import logging
+import secrets
+import threading
+import time
+from functools import wraps
+from flask import current_app, g, request, session
+from config import DEFAULT_SECRET_KEY
+from app.utils.cache import LRUCacheBackend, create_cache_backend, is_shared_backend
+from app.utils.json_provider import dumps_bytes, loads
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidToken(Exception):
+    """權杖格式錯誤、簽章不符、已過期或已撤銷"""
+
+
+class CsrfError(InvalidToken):
+    """以會話認證的寫入請求缺少或帶了錯誤的 CSRF 權杖"""
+
+
+# 不改變狀態的方法，以會話認證時不檢查 CSRF 權杖
+CSRF_SAFE_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+CSRF_HEADER = 'X-CSRF-Token'
+
+
+def csrf_token():
+    """
+    目前會話的 CSRF 權杖（第一次呼叫時產生），模板以 <meta name="csrf-token"> 提供給前端
+    未登入時回傳空字串，不為匿名訪客建立會話
+    """
+    if 'user_id' not in session:
+        return ''
+    if 'csrf_token' not in session:
+        session['csrf_token'] = secrets.token_urlsafe(32)
+    return session['csrf_token']
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+def _derive_key(secret):
+    """由設定的密鑰衍生權杖專用的簽章金鑰，與會話 cookie 的簽章分開"""
+    return hmac.new(secret.encode(), b'flask_demo.api-token', hashlib.sha256).digest()
+
+
+class ApiTokens:
+    """
+    HMAC 簽章的無狀態 API 權杖：<kid>.<payload>.<簽章>
+    - payload 包含用戶 id（sub）、簽發與到期時間、權杖 id（jti）
+    - 以 kid 選擇驗證金鑰，新增金鑰放在 API_TOKEN_KEYS 最前面即可輪替，舊權杖到期前仍可驗證
+    - 驗證只需計算 HMAC，已驗證的權杖另有行程內快取
+    - 撤銷記錄在精簡的 denylist（jti 或整個用戶），項目在權杖到期後自動移除
+    - denylist 預設只在本行程內有效，多個 worker 時必須使用 redis（見 check_workers）
+    """
+
+    def __init__(self, app=None):
+        self.keys = {}
+        self.current_kid = None
+        self.ttl = 3600
+        self.require_shared_denylist = True
+        self._cache = None
+        self.denylist = None
+        self._lock = threading.Lock()
+        self._stats = {"cache_hits": 0, "verified": 0, "rejected": 0, "revoked": 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        綁定應用並載入簽章金鑰
+        :raises RuntimeError: 非除錯、非測試模式下使用公開的預設密鑰（任何人都能偽造權杖與會話）
+        """
+        keys = app.config['API_TOKEN_KEYS'] or [('default', app.config['SECRET_KEY'])]
+        # 會話 cookie 也能通過 token_required，因此 SECRET_KEY 一併檢查
+        secrets_in_use = [app.config['SECRET_KEY'], *(secret for _, secret in keys)]
+        if not (app.debug or app.testing) and any(secret in ('', DEFAULT_SECRET_KEY) for secret in secrets_in_use):
+            raise RuntimeError("簽章密鑰仍是預設值，請設定 SECRET_KEY（與 API_TOKEN_KEYS）")
+        self.keys = {kid: _derive_key(secret) for kid, secret in keys}
+        self.current_kid = keys[0][0]
+        self.ttl = app.config['API_TOKEN_TTL']
+        self._cache = LRUCacheBackend(maxsize=app.config['API_TOKEN_CACHE_SIZE'], ttl=app.config['API_TOKEN_CACHE_TTL'])
+        self.denylist = create_cache_backend(app.config, 'API_TOKEN_DENYLIST')
+        self.require_shared_denylist = app.config['API_TOKEN_REQUIRE_SHARED_DENYLIST']
+        app.extensions['api_tokens'] = self
+        app.context_processor(lambda: {"csrf_token": csrf_token})
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _sign(self, kid, message):
+        return _b64encode(hmac.new(self.keys[kid], message.encode('ascii'), hashlib.sha256).digest())
+
+    def issue(self, user_id):
+        """
+        簽發權杖
+        :return: (權杖, 有效秒數)
+        """
+        # iat 保留小數，與 revoke_user 的撤銷時間比較時不會因為同一秒而誤判
+        now = time.time()
+        claims = {"sub": user_id, "iat": now, "exp": int(now) + self.ttl, "jti": secrets.token_urlsafe(9)}
+        message = f"{self.current_kid}.{_b64encode(dumps_bytes(claims))}"
+        return f"{message}.{self._sign(self.current_kid, message)}", self.ttl
+
+    def _decode(self, token):
+        """檢查簽章並解出 claims（不檢查到期與撤銷）"""
+        try:
+            kid, payload, signature = token.split('.')
+        except ValueError:
+            raise InvalidToken("權杖格式錯誤")
+        if not token.isascii():
+            raise InvalidToken("權杖格式錯誤")
+        if kid not in self.keys:
+            raise InvalidToken("未知的簽章金鑰")
+        if not hmac.compare_digest(signature, self._sign(kid, f"{kid}.{payload}")):
+            raise InvalidToken("權杖簽章不符")
+        try:
+            claims = loads(_b64decode(payload))
+            int(claims['sub']), float(claims['iat']), int(claims['exp']), str(claims['jti'])
+        except (ValueError, TypeError, KeyError):
+            raise InvalidToken("權杖格式錯誤")
+        return claims
+
+    def verify(self, token):
+        """
+        驗證權杖，不查詢資料庫
+        :return: claims 字典
+        :raises InvalidToken: 權杖無效、過期或已撤銷
+        """
+        claims = self._cache.get(token)
+        if claims is not None:
+            self._count("cache_hits")
+        else:
+            try:
+                claims = self._decode(token)
+            except InvalidToken:
+                self._count("rejected")
+                raise
+            self._cache.set(token, claims)
+            self._count("verified")
+
+        if claims['exp'] <= time.time():
+            raise InvalidToken("權杖已過期")
+        if self.is_revoked(claims):
+            raise InvalidToken("權杖已撤銷")
+        return claims
+
+    # === 撤銷 ===
+    def is_revoked(self, claims):
+        if self.denylist.get(f"jti:{claims['jti']}") is not None:
+            return True
+        revoked_at = self.denylist.get(f"user:{claims['sub']}")
+        return revoked_at is not None and claims['iat'] < revoked_at
+
+    def revoke(self, claims):
+        """撤銷單一權杖（登出）"""
+        self.denylist.set(f"jti:{claims['jti']}", claims['exp'])
+        self._count("revoked")
+
+    def revoke_user(self, user_id):
+        """撤銷用戶目前所有的權杖（修改密碼、刪除用戶），之後簽發的權杖不受影響"""
+        self.denylist.set(f"user:{user_id}", time.time())
+        self._count("revoked")
+
+    @property
+    def denylist_shared(self):
+        """denylist 是否由多個行程共用（CACHE_REDIS_URL 未設定時 'shared' 只是本機替代品）"""
+        return is_shared_backend(self.denylist)
+
+    def check_workers(self, workers):
+        """
+        多個 worker 時檢查 denylist 是否共用，否則登出與修改密碼只在其中一個 worker 生效
+        :raises RuntimeError: API_TOKEN_REQUIRE_SHARED_DENYLIST 開啟且 denylist 未共用
+        """
+        if workers <= 1 or self.denylist_shared:
+            return
+        message = (
+            f"{workers} 個 worker 各自保存權杖 denylist，撤銷只在單一 worker 生效；"
+            "請設定 API_TOKEN_DENYLIST_BACKEND=shared 與 CACHE_REDIS_URL"
+        )
+        if self.require_shared_denylist:
+            raise RuntimeError(message)
+        logger.warning(message)
+
+    def stats(self):
+        """驗證與快取統計"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["cached_tokens"] = len(self._cache)
+        # 共用後端（redis）無法便宜地計算項目數，只回報行程內 denylist 的大小
+        if isinstance(self.denylist, LRUCacheBackend):
+            stats["denylist_size"] = len(self.denylist)
+        stats["current_kid"] = self.current_kid
+        stats["denylist_shared"] = self.denylist_shared
+        return stats
+
+    # === 請求 ===
+    def authenticate(self):
+        """
+        取得目前請求的用戶 id：Authorization: Bearer <權杖>，或網頁登入的會話
+        以會話認證的寫入請求（POST、DELETE 等）必須帶 X-CSRF-Token 標頭，否則跨站表單可以冒用 cookie
+        結果在同一請求內重複使用（准入控制與 token_required 都會呼叫）
+        :raises InvalidToken: 沒有或無效的認證資訊
+        """
+        if 'auth_result' not in g:
+            try:
+                g.auth_result = self._authenticate()
+            except InvalidToken as e:
+                g.auth_result = e
+        if isinstance(g.auth_result, InvalidToken):
+            raise g.auth_result
+        return g.auth_result
+
+    def _authenticate(self):
+        scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+        if scheme.lower() == 'bearer' and token:
+            g.api_token = self.verify(token.strip())
+            return g.api_token['sub']
+        if 'user_id' in session:
+            if request.method not in CSRF_SAFE_METHODS:
+                expected = session.get('csrf_token')
+                provided = request.headers.get(CSRF_HEADER, '')
+                if not expected or not hmac.compare_digest(provided.encode(), expected.encode()):
+                    raise CsrfError("缺少或無效的 CSRF 權杖")
+            g.api_token = None
+            return session['user_id']
+        raise InvalidToken("需要登入")
+
+
+api_tokens = ApiTokens()
+
+
+def _auth_error(status_code, message):
+    """與 API error_response 相同格式的認證錯誤響應"""
+    response = current_app.response_class(
+        dumps_bytes({"success": False, "message": message, "errors": None}),
+        status=status_code, mimetype='application/json',
+    )
+    if status_code == 401:
+        response.headers['WWW-Authenticate'] = 'Bearer'
+    return response
+
+
+def _check_request(kwargs):
+    """通過時回傳 None，否則回傳錯誤響應"""
+    try:
+        user_id = api_tokens.authenticate()
+    except CsrfError as e:
+        return _auth_error(403, str(e))
+    except InvalidToken as e:
+        return _auth_error(401, str(e))
+    if 'user_id' in kwargs and kwargs['user_id'] != user_id:
+        return _auth_error(403, "無權存取其他用戶的資料")
+    g.auth_user_id = user_id
+    return None
+
+
+def token_required(view):
+    """
+    需要認證的路由（支援同步與非同步視圖）
+    路由有 user_id 參數時只允許存取自己的資料，認證的用戶 id 放在 g.auth_user_id
+    """
+    if inspect.iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(*args, **kwargs):
+            error = _check_request(kwargs)
+            if error is not None:
+                return error
+            return await view(*args, **kwargs)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        error = _check_request(kwargs)
+        if error is not None:
+            return error
+        return view(*args, **kwargs)
+    return wrapper
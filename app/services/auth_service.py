@@ -1,5 +1,9 @@
-from app.database import db
+from sqlalchemy import select, or_
+from app.database import db, read_replica
 from app.models.user import User
+from app.services.user_cache import user_cache
+from app.services.password_hasher import password_hasher
+from app.utils.bulk import bulk_insert, bulk_summary, item_error
 
 class AuthService:
     @staticmethod
@@ -10,7 +14,7 @@ class AuthService:
             return None, "用戶名已存在"
         
         # 檢查信箱是否已存在
-        if User.query.filter_by(email=email).first():
+        if User.find_by_email(email):
             return None, "信箱已被註冊"
         
         # 創建新用戶
@@ -22,15 +26,100 @@ class AuthService:
         
         return new_user, "註冊成功"
     
+    @staticmethod
+    def bulk_create_users(items, batch_size=500):
+        """
+        批次創建用戶
+        - 批次內重複與資料庫中已存在的用戶名／信箱只用一次 IN 查詢檢查
+        - 密碼雜湊在執行緒池中平行計算
+        :param items: 每筆包含 username、email、password 的字典列表
+        :return: {"created", "failed", "results"}，results 依輸入順序排列
+        """
+        results = {}
+        candidates = []
+        seen_usernames = set()
+        seen_emails = set()
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                results[index] = item_error(index, "資料格式錯誤")
+                continue
+
+            username = item.get('username')
+            email = item.get('email')
+            password = item.get('password')
+            if not all([username, email, password]):
+                results[index] = item_error(index, "請提供用戶名、電子郵件和密碼")
+                continue
+            if not all(isinstance(value, str) for value in (username, email, password)):
+                results[index] = item_error(index, "用戶名、電子郵件和密碼必須是字串")
+                continue
+            if username in seen_usernames:
+                results[index] = item_error(index, "用戶名在批次中重複")
+                continue
+            if email.lower() in seen_emails:
+                results[index] = item_error(index, "電子郵件在批次中重複")
+                continue
+
+            seen_usernames.add(username)
+            seen_emails.add(email.lower())
+            candidates.append((index, username, email, password))
+
+        # 一次查出已存在的用戶名與信箱
+        existing_usernames = set()
+        existing_emails = set()
+        if candidates:
+            rows = db.session.execute(
+                select(User.username, User.email).where(or_(
+                    User.username.in_(seen_usernames),
+                    db.func.lower(User.email).in_(seen_emails),
+                ))
+            )
+            for username, email in rows:
+                existing_usernames.add(username)
+                existing_emails.add(email.lower())
+
+        accepted = []
+        for index, username, email, password in candidates:
+            if username in existing_usernames:
+                results[index] = item_error(index, "用戶名已存在")
+            elif email.lower() in existing_emails:
+                results[index] = item_error(index, "電子郵件已存在")
+            else:
+                accepted.append((index, username, email, password))
+
+        hashes = password_hasher.hash_many([password for *_, password in accepted])
+        rows = [
+            (index, {"username": username, "email": email, "password_hash": pwhash})
+            for (index, username, email, _), pwhash in zip(accepted, hashes)
+        ]
+        results.update(bulk_insert(User, rows, batch_size))
+        return bulk_summary(len(items), results)
+    
     @staticmethod
     def authenticate_user(username, password):
-        """驗證用戶"""
+        """
+        驗證用戶，成功時順便把舊參數的密碼雜湊升級
+        :raises PasswordHasherBusy: 密碼驗證佇列已滿
+        """
         user = User.query.filter_by(username=username).first()
-        if user and user.check_password(password):
-            return user, True
-        return None, False
+        if not user or not user.check_password(password):
+            return None, False
+
+        if user.rehash_password_if_needed(password):
+            try:
+                db.session.commit()
+            except Exception:
+                # 升級失敗不影響登入，下次登入再試
+                db.session.rollback()
+        return user, True
     
     @staticmethod
     def get_user_by_id(user_id):
-        """根據ID獲取用戶"""
-        return User.query.get(user_id)
\ No newline at end of file
+        """根據ID獲取用戶（從讀取副本）"""
+        with read_replica():
+            return db.session.get(User, user_id)
+    
+    @staticmethod
+    def get_user_data(user_id):
+        """根據ID獲取用戶資料字典（經過快取）"""
+        return user_cache.get_user_dict(user_id)
\ No newline at end of file
@@ -0,0 +1,177 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from app.models.contact import ContactMessage
+from app.utils.bulk import bulk_insert
+
+logger = logging.getLogger(__name__)
+
+
+class ContactWriteBuffer:
+    """
+    聯絡訊息的 write-behind 緩衝
+    - 驗證過的訊息放入有上限的佇列，由背景執行緒依筆數或時間窗口合併成一次交易寫入
+    - 佇列已滿時 enqueue() 回傳 False，呼叫者改為同步寫入
+    - 程式正常結束時會把剩餘的訊息寫完
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.enabled = False
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._atexit_registered = False
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._stats = {
+            "enqueued": 0,
+            "rejected": 0,
+            "flushed": 0,
+            "failed": 0,
+            "flushes": 0,
+            "last_flush_ms": 0.0,
+            "max_flush_ms": 0.0,
+            "last_wait_ms": 0.0,
+            "max_wait_ms": 0.0,
+        }
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """綁定應用並讀取配置"""
+        self.app = app
+        self.enabled = app.config['CONTACT_WRITE_BEHIND']
+        self.batch_size = app.config['CONTACT_FLUSH_BATCH']
+        self.interval = app.config['CONTACT_FLUSH_INTERVAL']
+        self._queue = queue.Queue(maxsize=app.config['CONTACT_BUFFER_SIZE'])
+        app.extensions['contact_buffer'] = self
+        if self.enabled and not self._atexit_registered:
+            atexit.register(self.shutdown)
+            self._atexit_registered = True
+
+    def _ensure_started(self):
+        """第一次寫入時才啟動背景執行緒（fork 後的子行程或執行緒意外結束時會重新啟動）"""
+        if self._running():
+            return
+        with self._lock:
+            if not self._running():
+                self._pid = os.getpid()
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name='contact-flusher', daemon=True)
+                self._thread.start()
+
+    def _running(self):
+        thread = self._thread
+        return thread is not None and self._pid == os.getpid() and thread.is_alive()
+
+    def enqueue(self, values):
+        """
+        放入一則訊息
+        :param values: ContactMessage 欄位字典
+        :return: 是否成功放入（False 表示佇列已滿）
+        """
+        self._ensure_started()
+        values = dict(values, created_at=values.get('created_at') or datetime.utcnow())
+        try:
+            self._queue.put_nowait((time.monotonic(), values))
+        except queue.Full:
+            self._count("rejected")
+            return False
+        self._count("enqueued")
+        return True
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._stats[name] += amount
+
+    def _collect(self):
+        """收集一批訊息：湊滿 batch_size 或等到時間窗口結束"""
+        try:
+            batch = [self._queue.get(timeout=self.interval)]
+        except queue.Empty:
+            return []
+
+        deadline = time.monotonic() + self.interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._collect()
+            if not batch:
+                continue
+            try:
+                self._flush(batch)
+            except Exception:
+                # 寫入以外的錯誤（例如無法取得連線）不應讓背景執行緒結束
+                logger.exception("聯絡訊息寫入失敗，捨棄 %d 則", len(batch))
+                self._count("failed", len(batch))
+
+    def _flush(self, batch):
+        """以一個交易寫入整批訊息，失敗的批次由 bulk_insert 拆開重試，只捨棄有問題的訊息"""
+        start = time.monotonic()
+        rows = [(index, values) for index, (_, values) in enumerate(batch)]
+        with self.app.app_context():
+            results = bulk_insert(ContactMessage, rows, batch_size=len(rows))
+        finished = time.monotonic()
+
+        flushed = sum(1 for item in results.values() if item["success"])
+        if flushed < len(batch):
+            logger.warning("聯絡訊息寫入失敗，捨棄 %d / %d 則", len(batch) - flushed, len(batch))
+        flush_ms = (finished - start) * 1000
+        wait_ms = (finished - batch[0][0]) * 1000
+        with self._lock:
+            stats = self._stats
+            stats["flushed"] += flushed
+            stats["failed"] += len(batch) - flushed
+            stats["flushes"] += 1
+            stats["last_flush_ms"] = round(flush_ms, 2)
+            stats["max_flush_ms"] = round(max(stats["max_flush_ms"], flush_ms), 2)
+            stats["last_wait_ms"] = round(wait_ms, 2)
+            stats["max_wait_ms"] = round(max(stats["max_wait_ms"], wait_ms), 2)
+
+    def flush_all(self):
+        """同步寫完佇列中剩餘的訊息"""
+        while True:
+            batch = []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                return
+            self._flush(batch)
+
+    def shutdown(self, timeout=10):
+        """停止背景執行緒並寫完剩餘的訊息"""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread.is_alive() and self._pid == os.getpid():
+            thread.join(timeout)
+        self._thread = None
+        self.flush_all()
+
+    def stats(self):
+        """佇列深度與寫入延遲統計"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["enabled"] = self.enabled
+        stats["queue_depth"] = self._queue.qsize() if self._queue else 0
+        stats["queue_capacity"] = self._queue.maxsize if self._queue else 0
+        return stats
+
+
+contact_buffer = ContactWriteBuffer()
@@ -1,5 +1,10 @@
-from app.database import db
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.orm import aliased
+from sqlalchemy.orm.attributes import set_committed_value
+from app.database import db, async_db
 from app.models.contact import ContactMessage
+from app.utils.bulk import bulk_insert, bulk_summary, item_error
+from app.services.contact_buffer import contact_buffer
 
 class ContactService:
     @staticmethod
@@ -20,6 +25,66 @@ class ContactService:
         
         return contact_msg, f"謝謝 {name}！我們已收到你的訊息並保存到資料庫"
     
+    @staticmethod
+    def submit_message(name, email, message, user_id=None):
+        """
+        提交已驗證的聯絡訊息
+        啟用 write-behind 時放入緩衝佇列，否則（或佇列已滿時）直接寫入
+        :return: (contact_msg, queued)，放入佇列時 contact_msg 為 None
+        """
+        if contact_buffer.enabled and contact_buffer.enqueue(
+            {"name": name, "email": email, "message": message, "user_id": user_id}
+        ):
+            return None, True
+
+        contact_msg = ContactMessage(name=name, email=email, message=message, user_id=user_id)
+        db.session.add(contact_msg)
+        db.session.commit()
+        return contact_msg, False
+    
+    @staticmethod
+    async def submit_message_async(name, email, message, user_id=None):
+        """submit_message 的非同步版本，直接寫入時使用 async_db"""
+        if contact_buffer.enabled and contact_buffer.enqueue(
+            {"name": name, "email": email, "message": message, "user_id": user_id}
+        ):
+            return None, True
+
+        contact_msg = ContactMessage(name=name, email=email, message=message, user_id=user_id)
+        async with async_db.session() as session:
+            session.add(contact_msg)
+            await session.commit()
+        return contact_msg, False
+
+    @staticmethod
+    def bulk_create_messages(items, batch_size=500):
+        """
+        批次創建聯絡訊息
+        :param items: 每筆包含 name、email、message 的字典列表
+        :return: {"created", "failed", "results"}，results 依輸入順序排列
+        """
+        results = {}
+        rows = []
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                results[index] = item_error(index, "資料格式錯誤")
+                continue
+
+            name = item.get('name')
+            email = item.get('email')
+            message = item.get('message')
+            if not all([name, email, message]):
+                results[index] = item_error(index, "請提供姓名、電子郵件和訊息")
+                continue
+            if not all(isinstance(value, str) for value in (name, email, message)):
+                results[index] = item_error(index, "姓名、電子郵件和訊息必須是字串")
+                continue
+
+            rows.append((index, {"name": name, "email": email, "message": message}))
+
+        results.update(bulk_insert(ContactMessage, rows, batch_size))
+        return bulk_summary(len(items), results)
+    
     @staticmethod
     def get_all_messages():
         """獲取所有聯絡訊息"""
@@ -33,4 +98,89 @@ class ContactService:
     @staticmethod
     def get_message_by_id(message_id):
         """根據ID獲取單個訊息"""
-        return ContactMessage.query.get(message_id)
\ No newline at end of file
+        return ContactMessage.query.get(message_id)
+    
+    @staticmethod
+    def get_messages_page(after=None, limit=20, start=None, end=None, user_id=None):
+        """
+        分頁取得訊息（由新到舊），可依日期區間與用戶篩選
+        - 依 (created_at, id) 排序，與 (created_at) 和 (user_id, created_at) 索引的順序相同
+          （SQLite 索引最後隱含 rowid 即 id），每頁只讀取 limit 筆，不需要排序整個結果集
+        - 游標仍是上一頁最後一則訊息的 id，以主鍵查出它的 created_at 作為起點
+        :param after: 上一頁最後一則訊息的 id
+        :param start: 起始時間（含）
+        :param end: 結束時間（不含）
+        :return: (messages, next_cursor)
+        """
+        query = ContactMessage.query
+        if start is not None:
+            query = query.filter(ContactMessage.created_at >= start)
+        if end is not None:
+            query = query.filter(ContactMessage.created_at < end)
+        if user_id is not None:
+            query = query.filter(ContactMessage.user_id == user_id)
+
+        if after is not None:
+            anchor = db.session.scalar(select(ContactMessage.created_at).where(ContactMessage.id == after))
+            if anchor is not None:
+                query = query.filter(
+                    tuple_(ContactMessage.created_at, ContactMessage.id) < tuple_(anchor, after)
+                )
+            else:
+                # 游標訊息已刪除，退回只以 id 定位
+                query = query.filter(ContactMessage.id < after)
+
+        # 多取一筆用來判斷是否還有下一頁
+        messages = query.order_by(ContactMessage.created_at.desc(), ContactMessage.id.desc()).limit(limit + 1).all()
+        if len(messages) > limit:
+            messages = messages[:limit]
+            return messages, messages[-1].id
+        return messages, None
+
+    @staticmethod
+    def count_messages_by_user(user_ids):
+        """
+        一次分組查詢計算多位用戶的訊息數
+        :return: {user_id: 訊息數}，沒有訊息的用戶不在字典中
+        """
+        if not user_ids:
+            return {}
+        rows = db.session.execute(
+            select(ContactMessage.user_id, func.count(ContactMessage.id))
+            .where(ContactMessage.user_id.in_(user_ids))
+            .group_by(ContactMessage.user_id)
+        )
+        return dict(rows.all())
+
+    @staticmethod
+    def attach_recent_messages(users, per_user):
+        """
+        以一次查詢取得每位用戶最新的 per_user 則訊息，並直接填入 user.messages
+        （填入後存取 user.messages 不會再觸發延遲載入）
+        每位用戶以相關子查詢 LIMIT per_user 走 (user_id, id) 索引，只讀取頁面用戶數 × per_user 筆
+        """
+        if not users:
+            return
+        from app.models.user import User
+
+        recent = aliased(ContactMessage)
+        latest_ids = (
+            select(recent.id)
+            .where(recent.user_id == User.id)
+            .order_by(recent.id.desc())
+            .limit(per_user)
+            .correlate(User)
+        )
+        messages = db.session.scalars(
+            select(ContactMessage)
+            .select_from(User)
+            .join(ContactMessage, ContactMessage.id.in_(latest_ids))
+            .where(User.id.in_([user.id for user in users]))
+            .order_by(ContactMessage.id.desc())
+        )
+
+        grouped = {user.id: [] for user in users}
+        for message in messages:
+            grouped[message.user_id].append(message)
+        for user in users:
+            set_committed_value(user, 'messages', grouped[user.id])
@@ -0,0 +1,234 @@
+import threading
+import time
+import uuid
+from datetime import datetime
+from app.database import db
+from app.services.user_cache import user_cache
+from app.services.metrics import metrics
+from app.utils.cache import create_cache_backend, is_shared_backend
+from app.utils.file_helpers import create_avatar_renditions, remove_avatar_files, discard_upload
+
+
+def _timed_renditions(*args):
+    """在子行程中產生頭像，回傳 (結果, 處理秒數)"""
+    start = time.perf_counter()
+    result = create_avatar_renditions(*args)
+    return result, time.perf_counter() - start
+
+
+class QueueFullError(Exception):
+    """圖片處理佇列已滿"""
+
+
+class ImageJobQueue:
+    """
+    背景圖片處理佇列
+    - 以 ProcessPoolExecutor 執行縮圖，不佔用請求執行緒
+    - 完成後的資料庫寫入交給另一個執行緒，較慢或被鎖住的寫入不會拖住行程池收集其他工作的結果
+    - 以 semaphore 限制排隊中的工作數量，滿了直接拒絕（backpressure）
+    - 工作狀態存放在 IMAGE_JOB_BACKEND，多個 worker 時必須共用，任何 worker 都能回答查詢（見 check_workers）
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._executor = None
+        self._broken_executor = None
+        self._finisher = None
+        self._slots = None
+        self.jobs = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """綁定應用並讀取配置"""
+        self.app = app
+        self.max_workers = app.config['IMAGE_WORKERS']
+        self.max_pending = app.config['IMAGE_QUEUE_SIZE']
+        self.max_pixels = app.config['MAX_IMAGE_PIXELS']
+        self.sizes = app.config['AVATAR_RENDITION_SIZES']
+        self.formats = app.config['AVATAR_FORMATS']
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self.jobs = create_cache_backend(app.config, 'IMAGE_JOB')
+        app.extensions['image_queue'] = self
+
+    def _get_executor(self):
+        """第一次提交工作時才建立行程池"""
+        from concurrent.futures import ProcessPoolExecutor
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                self._broken_executor = None
+            return self._executor
+
+    def _get_finisher(self):
+        """完成工作的執行緒（寫入資料庫、清理檔案），依序處理"""
+        from concurrent.futures import ThreadPoolExecutor
+
+        with self._lock:
+            if self._finisher is None:
+                self._finisher = ThreadPoolExecutor(max_workers=1, thread_name_prefix='image-finish')
+            return self._finisher
+
+    def _reset_executor(self, executor):
+        """
+        子行程異常結束（OOM、解碼器崩潰）後行程池無法再使用，丟棄後下次提交時重建
+        損壞的行程池已自行終止子行程，不需要 shutdown；它的管理執行緒在標記損壞時持有鎖，
+        此時釋放最後一個參考會等待同一把鎖，因此先保留在 _broken_executor，建立新的行程池時才釋放
+        """
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+                self._broken_executor = executor
+
+    def _submit(self, *args):
+        """
+        提交到行程池，行程池已損壞時重建並重試一次
+        :return: (executor, future)
+        """
+        from concurrent.futures.process import BrokenProcessPool
+
+        executor = self._get_executor()
+        try:
+            return executor, executor.submit(*args)
+        except BrokenProcessPool:
+            self._reset_executor(executor)
+            executor = self._get_executor()
+            return executor, executor.submit(*args)
+
+    def submit_avatar(self, user_id, source, avatar_folder, avatar_name):
+        """
+        提交頭像縮圖工作（一次產生所有尺寸與格式）
+        :param source: 上傳內容（bytes）或暫存檔路徑，見 spool_upload
+        :param avatar_folder: 頭像輸出資料夾
+        :param avatar_name: 頭像檔名前綴
+        :return: job_id
+        :raises QueueFullError: 佇列已滿
+        """
+        if not self._slots.acquire(blocking=False):
+            raise QueueFullError("圖片處理佇列已滿")
+
+        job_id = uuid.uuid4().hex
+        job = {
+            "id": job_id,
+            "status": "queued",
+            "user_id": user_id,
+            "avatar_url": None,
+            "error": None,
+            "created_at": datetime.utcnow().isoformat(),
+            "finished_at": None,
+        }
+        self.jobs.set(job_id, job)
+
+        submitted_at = time.perf_counter()
+        try:
+            executor, future = self._submit(
+                _timed_renditions, source, avatar_folder, avatar_name,
+                self.sizes, self.formats, self.max_pixels
+            )
+        except Exception:
+            self._slots.release()
+            self.jobs.delete(job_id)
+            raise
+
+        # 完成回呼在行程池的管理執行緒中執行，只轉交給 finisher，不在那裡寫入資料庫
+        future.add_done_callback(
+            lambda f: self._get_finisher().submit(
+                self._on_avatar_done, f, executor, job_id, user_id, source, avatar_folder, avatar_name, submitted_at
+            )
+        )
+        return job_id
+
+    def _on_avatar_done(self, future, executor, job_id, user_id, source, avatar_folder, avatar_name, submitted_at):
+        """縮圖完成後更新用戶頭像（在 finisher 執行緒中執行）"""
+        from concurrent.futures.process import BrokenProcessPool
+
+        # image_job 包含排隊時間，image_process 只有子行程內的處理時間
+        metrics.observe_span('image_job', time.perf_counter() - submitted_at)
+        try:
+            with self.app.app_context():
+                try:
+                    error = future.exception()
+                    if error is not None:
+                        if isinstance(error, BrokenProcessPool):
+                            self._reset_executor(executor)
+                        raise RuntimeError("圖片處理失敗")
+                    written, seconds = future.result()
+                    metrics.observe_span('image_process', seconds)
+                    if not written:
+                        raise RuntimeError("圖片處理失敗")
+                    avatar_url = self._apply_avatar(user_id, avatar_folder, avatar_name)
+                except Exception:
+                    remove_avatar_files(avatar_folder, avatar_name)
+                    raise
+            self._finish(job_id, "done", avatar_url=avatar_url)
+        except Exception as e:
+            self._finish(job_id, "failed", error=str(e))
+        finally:
+            discard_upload(source)
+            self._slots.release()
+
+    def _apply_avatar(self, user_id, avatar_folder, avatar_name):
+        """將處理好的頭像寫入用戶資料並刪除舊頭像"""
+        from app.models.user import User
+
+        user = db.session.get(User, user_id)
+        if not user:
+            raise LookupError("用戶不存在")
+
+        old_filename = user.avatar_filename
+        try:
+            user.avatar_filename = avatar_name
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        user_cache.invalidate(user_id)
+
+        # 刪除舊頭像（如果存在）
+        remove_avatar_files(avatar_folder, old_filename)
+        return user.get_avatar_url()
+
+    def _finish(self, job_id, status, avatar_url=None, error=None):
+        """記錄工作結果（只有提交工作的行程會寫入），結果保留 IMAGE_JOB_TTL 秒"""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return
+        self.jobs.set(job_id, dict(
+            job,
+            status=status,
+            avatar_url=avatar_url,
+            error=error,
+            finished_at=datetime.utcnow().isoformat(),
+        ))
+
+    def get_job(self, job_id):
+        """取得工作狀態"""
+        job = self.jobs.get(job_id)
+        return dict(job) if job else None
+
+    def check_workers(self, workers):
+        """
+        多個 worker 時檢查工作狀態是否共用，否則查詢多半落在其他 worker 而回 404
+        :raises RuntimeError: 工作狀態未共用
+        """
+        if workers > 1 and not is_shared_backend(self.jobs):
+            raise RuntimeError(
+                f"{workers} 個 worker 各自保存圖片工作狀態，GET /api/jobs/<id> 會查不到其他 worker 的工作；"
+                "請設定 IMAGE_JOB_BACKEND=shared 與 CACHE_REDIS_URL"
+            )
+
+    def shutdown(self, wait=True):
+        """關閉行程池與 finisher（先等行程池，已完成的工作才會全部交給 finisher）"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+        with self._lock:
+            finisher, self._finisher = self._finisher, None
+        if finisher is not None:
+            finisher.shutdown(wait=wait)
+
+
+image_queue = ImageJobQueue()
@@ -0,0 +1,216 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from flask import g, request, has_request_context
+from sqlalchemy import event
+from app.database import db
+
+logger = logging.getLogger(__name__)
+
+
+def _escape(value):
+    """Prometheus 標籤值跳脫"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + '}'
+
+
+class Counter:
+    """Prometheus counter（依標籤分組）"""
+
+    kind = 'counter'
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, *labels):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def collect(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+
+
+class Histogram:
+    """Prometheus histogram（固定 bucket，依標籤分組）"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help, buckets, labelnames=()):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                # [各 bucket 次數..., 總和, 次數]
+                series = self._values[labels] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def collect(self):
+        with self._lock:
+            items = sorted((labels, list(series)) for labels, series in self._values.items())
+        names = self.labelnames + ('le',)
+        for labels, series in items:
+            for bound, count in zip(self.buckets, series):
+                yield f"{self.name}_bucket{_format_labels(names, labels + (bound,))} {count}"
+            yield f"{self.name}_bucket{_format_labels(names, labels + ('+Inf',))} {series[-1]}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {series[-2]}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {series[-1]}"
+
+
+class Metrics:
+    """
+    請求層級的效能量測
+    - 每個端點的延遲分布與請求數
+    - 以 SQLAlchemy 事件統計每個請求的 SQL 數量與時間，超過 SLOW_QUERY_SECONDS 記錄慢查詢
+    - span() 量測圖片處理、密碼雜湊等區段
+    - /metrics 輸出 Prometheus 格式，響應附上 Server-Timing 標頭
+    - 數據只保存在本行程內，多行程部署時每個 worker 各自輸出
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.server_timing = False
+        self.slow_query_seconds = None
+        self._reset(buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10))
+        if app is not None:
+            self.init_app(app)
+
+    def _reset(self, buckets):
+        self.requests = Counter(
+            'http_requests_total', '請求數', ('endpoint', 'method', 'status'))
+        self.latency = Histogram(
+            'http_request_duration_seconds', '請求處理時間', buckets, ('endpoint', 'method'))
+        self.sql_queries = Histogram(
+            'http_request_sql_queries', '每個請求的 SQL 數量', (0, 1, 2, 3, 5, 10, 25, 50, 100), ('endpoint',))
+        self.sql_seconds = Counter(
+            'sql_query_seconds_total', 'SQL 執行時間總和', ('endpoint',))
+        self.slow_queries = Counter(
+            'sql_slow_queries_total', '慢查詢次數', ('endpoint',))
+        self.admission_rejections = Counter(
+            'admission_rejections_total', '准入控制拒絕的請求數', ('endpoint_class', 'reason'))
+        self.spans = Histogram(
+            'span_duration_seconds', '區段執行時間（圖片處理、密碼雜湊等）', buckets, ('name',))
+        self._collectors = (
+            self.requests, self.latency, self.sql_queries, self.sql_seconds, self.slow_queries,
+            self.admission_rejections, self.spans
+        )
+
+    def init_app(self, app):
+        """綁定應用：註冊請求鉤子與 SQL 事件"""
+        self.enabled = app.config['METRICS_ENABLED']
+        self.server_timing = app.config['SERVER_TIMING_ENABLED']
+        self.slow_query_seconds = app.config['SLOW_QUERY_SECONDS']
+        self._reset(buckets=app.config['METRICS_LATENCY_BUCKETS'])
+        app.extensions['metrics'] = self
+        if not self.enabled:
+            return
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        with app.app_context():
+            for engine in db.engines.values():
+                self.instrument_engine(engine)
+
+    def instrument_engine(self, engine):
+        """統計引擎執行的 SQL（asyncio 引擎請傳入 engine.sync_engine）"""
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    # === 請求 ===
+    def _before_request(self):
+        g.metrics_start = time.perf_counter()
+        g.metrics_sql = [0, 0.0]
+        g.metrics_spans = {}
+
+    def _after_request(self, response):
+        start = g.pop('metrics_start', None)
+        if start is None:
+            return response
+        elapsed = time.perf_counter() - start
+        endpoint = request.endpoint or 'unknown'
+        sql_count, sql_time = g.metrics_sql
+
+        self.requests.inc(1, endpoint, request.method, response.status_code)
+        self.latency.observe(elapsed, endpoint, request.method)
+        self.sql_queries.observe(sql_count, endpoint)
+
+        if self.server_timing:
+            entries = [f'app;dur={elapsed * 1000:.1f}', f'db;dur={sql_time * 1000:.1f};desc="{sql_count} queries"']
+            entries += [f'{name};dur={seconds * 1000:.1f}' for name, seconds in g.metrics_spans.items()]
+            response.headers.add('Server-Timing', ', '.join(entries))
+        return response
+
+    # === SQL ===
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('metrics_start', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('metrics_start')
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+
+        in_request = has_request_context() and 'metrics_sql' in g
+        endpoint = (request.endpoint or 'unknown') if in_request else 'background'
+        if in_request:
+            g.metrics_sql[0] += 1
+            g.metrics_sql[1] += elapsed
+        self.sql_seconds.inc(elapsed, endpoint)
+
+        if self.slow_query_seconds is not None and elapsed >= self.slow_query_seconds:
+            self.slow_queries.inc(1, endpoint)
+            logger.warning("慢查詢 %.1fms [%s] %s", elapsed * 1000, endpoint, ' '.join(statement.split()))
+
+    # === 區段 ===
+    def observe_span(self, name, seconds):
+        """記錄一個區段的執行時間（在請求中時也會出現在 Server-Timing）"""
+        if not self.enabled:
+            return
+        self.spans.observe(seconds, name)
+        if has_request_context() and 'metrics_spans' in g:
+            g.metrics_spans[name] = g.metrics_spans.get(name, 0.0) + seconds
+
+    @contextmanager
+    def span(self, name):
+        """量測區段執行時間：with metrics.span('password_verify'): ..."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_span(name, time.perf_counter() - start)
+
+    # === 輸出 ===
+    def render(self):
+        """Prometheus 文字格式"""
+        lines = []
+        for collector in self._collectors:
+            lines.append(f"# HELP {collector.name} {collector.help}")
+            lines.append(f"# TYPE {collector.name} {collector.kind}")
+            lines.extend(collector.collect())
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
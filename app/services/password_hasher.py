@@ -0,0 +1,138 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app, request
+from werkzeug.security import generate_password_hash, check_password_hash
+from app.services.metrics import metrics
+from app.utils.json_provider import dumps_bytes
+
+
+class PasswordHasherBusy(Exception):
+    """密碼驗證佇列已滿或等待逾時"""
+
+
+class PasswordHasher:
+    """
+    密碼雜湊服務
+    - 雜湊方法與成本參數來自配置（PASSWORD_HASH_METHOD）
+    - 驗證在有上限的執行緒池中執行，登入尖峰時不會佔滿所有 CPU
+    - 批次雜湊（hash_many）使用另一個較小的執行緒池，大量匯入不會讓登入排隊或回 503
+    - 提供 needs_rehash() 判斷舊參數產生的雜湊
+    """
+
+    def __init__(self, app=None):
+        self.method = 'scrypt'
+        self.salt_length = 16
+        self._executor = None
+        self._bulk_executor = None
+        self._slots = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """綁定應用並讀取配置"""
+        self.method = app.config['PASSWORD_HASH_METHOD']
+        self.salt_length = app.config['PASSWORD_SALT_LENGTH']
+        self.workers = app.config['PASSWORD_HASH_WORKERS']
+        self.bulk_workers = app.config['PASSWORD_HASH_BULK_WORKERS']
+        self.timeout = app.config['PASSWORD_HASH_TIMEOUT']
+        self._slots = threading.BoundedSemaphore(app.config['PASSWORD_HASH_QUEUE_SIZE'])
+        self._executor = None
+        self._bulk_executor = None
+        # werkzeug 會補上預設參數（例如 scrypt -> scrypt:32768:8:1），以實際產生的前綴比對
+        self._method_prefix = None
+        app.extensions['password_hasher'] = self
+        app.register_error_handler(PasswordHasherBusy, self._busy_response)
+
+    @staticmethod
+    def _busy_response(error):
+        """名額已滿時所有建立、修改或驗證密碼的請求都回 503 與 Retry-After"""
+        message = "系統忙碌中，請稍後再試"
+        if request.blueprint and request.blueprint.startswith('api'):
+            # 與 API error_response 相同格式
+            response = current_app.response_class(
+                dumps_bytes({"success": False, "message": message, "errors": None}),
+                status=503, mimetype='application/json',
+            )
+        else:
+            response = current_app.response_class(message, status=503, mimetype='text/plain')
+        response.headers['Retry-After'] = str(current_app.config['PASSWORD_HASH_RETRY_AFTER'])
+        return response
+
+    @property
+    def method_prefix(self):
+        """目前配置產生的雜湊前綴，例如 scrypt:32768:8:1"""
+        if self._method_prefix is None:
+            self._method_prefix = generate_password_hash('', method=self.method, salt_length=1).split('$', 1)[0]
+        return self._method_prefix
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hash')
+            return self._executor
+
+    def _get_bulk_executor(self):
+        with self._lock:
+            if self._bulk_executor is None:
+                self._bulk_executor = ThreadPoolExecutor(
+                    max_workers=self.bulk_workers, thread_name_prefix='password-hash-bulk'
+                )
+            return self._bulk_executor
+
+    def _submit(self, func, *args):
+        """取得名額後提交到執行緒池"""
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PasswordHasherBusy("密碼驗證忙碌中")
+        try:
+            future = self._get_executor().submit(func, *args)
+        except Exception:
+            self._slots.release()
+            raise
+
+        # 工作真正結束才釋放名額，逾時的工作仍佔用名額
+        future.add_done_callback(lambda f: self._slots.release())
+        return future
+
+    def _run(self, func, *args):
+        """在執行緒池中執行，workers 為 0 時直接在請求執行緒執行"""
+        if not self.workers:
+            return func(*args)
+
+        future = self._submit(func, *args)
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            future.cancel()
+            raise PasswordHasherBusy("密碼驗證逾時")
+
+    def hash(self, password):
+        """以目前配置產生雜湊"""
+        with metrics.span('password_hash'):
+            return self._run(generate_password_hash, password, self.method, self.salt_length)
+
+    def hash_many(self, passwords):
+        """批次產生雜湊，在 PASSWORD_HASH_BULK_WORKERS 個執行緒中計算，不佔用登入的名額"""
+        with metrics.span('password_hash'):
+            if not self.workers or not self.bulk_workers:
+                return [generate_password_hash(p, self.method, self.salt_length) for p in passwords]
+
+            executor = self._get_bulk_executor()
+            futures = [executor.submit(generate_password_hash, p, self.method, self.salt_length) for p in passwords]
+            return [future.result() for future in futures]
+
+    def verify(self, pwhash, password):
+        """驗證密碼"""
+        with metrics.span('password_verify'):
+            return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        """雜湊方法、成本參數或 salt 長度與目前配置不同時回傳 True"""
+        parts = pwhash.split('$', 2)
+        if len(parts) != 3:
+            return True
+        method, salt, _ = parts
+        return method != self.method_prefix or len(salt) != self.salt_length
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,154 @@
+import click
+from sqlalchemy import text, column, or_
+from app.database import db
+from app.models.contact import ContactMessage
+
+# PostgreSQL 的全文檢索表達式，必須與遷移中的 GIN 索引一致才會用到索引
+PG_TSVECTOR = "to_tsvector('simple', name || ' ' || email || ' ' || message)"
+
+# 搜尋的欄位
+SEARCH_COLUMNS = ('name', 'email', 'message')
+
+
+class SearchService:
+    @staticmethod
+    def split_terms(query, min_length=3):
+        """
+        拆出搜尋詞
+        :return: (可用 trigram 全文檢索的詞, 短於 min_length 需要以 LIKE 比對的詞)
+        """
+        terms = list(dict.fromkeys(query.split()))
+        return [term for term in terms if len(term) >= min_length], [term for term in terms if len(term) < min_length]
+
+    @staticmethod
+    def build_match_query(query, min_length=3):
+        """
+        把使用者輸入轉成安全的 FTS5 查詢：每個詞都加上引號，多個詞為 AND
+        trigram 分詞需要至少 3 個字元，太短的詞會被略過（由 like_pattern 另外比對）
+        :return: FTS5 查詢字串，沒有可用的詞時回傳 None
+        """
+        terms, _ = SearchService.split_terms(query, min_length)
+        if not terms:
+            return None
+        return ' '.join('"' + term.replace('"', '""') + '"' for term in terms)
+
+    @staticmethod
+    def like_pattern(term):
+        """LIKE 子字串比對的樣式，跳脫 %、_ 與跳脫字元本身（ESCAPE '\\'）"""
+        escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        return f"%{escaped}%"
+
+    @staticmethod
+    def search_page(args, config):
+        """
+        解析請求參數並搜尋
+        :return: (query, page, results, has_next)
+        :raises ValueError: 參數格式錯誤
+        """
+        query = args.get('q', '').strip()
+        page = int(args.get('page', 1))
+        if page < 1 or page > config['SEARCH_MAX_PAGE']:
+            raise ValueError(f"page 必須介於 1 到 {config['SEARCH_MAX_PAGE']}")
+        results, has_next = SearchService.search_messages(
+            query, page, config['SEARCH_PAGE_SIZE'], config['SEARCH_MIN_TERM_LENGTH']
+        )
+        return query, page, results, has_next
+
+    @staticmethod
+    def search_messages(query, page=1, per_page=20, min_length=3):
+        """
+        依相關度搜尋聯絡訊息（name、email、message）
+        - SQLite：至少 3 個字元的詞走 trigram 全文檢索，較短的詞（例如兩個字的中文詞）以 LIKE 在結果中篩選
+        - 只有短詞或資料庫不支援全文檢索時，以 LIKE 掃描並由新到舊排序（rank 為 None）
+        :return: (結果列表 [(ContactMessage, rank)], has_next)；沒有搜尋詞時回傳 (None, False)
+        """
+        long_terms, short_terms = SearchService.split_terms(query, min_length)
+        if not long_terms and not short_terms:
+            return None, False
+
+        dialect = db.engine.dialect.name
+        params = {"limit": per_page + 1, "offset": (page - 1) * per_page}
+
+        if dialect == 'sqlite' and long_terms:
+            # bm25 越小越相關；短詞在全文檢索的結果中再以 LIKE 篩選
+            conditions = ["contact_message_fts MATCH :query"]
+            for index, term in enumerate(short_terms):
+                conditions.append(
+                    "(" + " OR ".join(f"contact_message.{name} LIKE :term_{index} ESCAPE '\\'"
+                                      for name in SEARCH_COLUMNS) + ")"
+                )
+                params[f"term_{index}"] = SearchService.like_pattern(term)
+            sql = text(
+                "SELECT contact_message_fts.rowid AS id, bm25(contact_message_fts) AS rank "
+                "FROM contact_message_fts JOIN contact_message ON contact_message.id = contact_message_fts.rowid "
+                f"WHERE {' AND '.join(conditions)} ORDER BY rank LIMIT :limit OFFSET :offset"
+            )
+            params["query"] = SearchService.build_match_query(query, min_length)
+        elif dialect == 'postgresql':
+            sql = text(
+                f"SELECT id, ts_rank({PG_TSVECTOR}, websearch_to_tsquery('simple', :query)) AS rank "
+                f"FROM contact_message WHERE {PG_TSVECTOR} @@ websearch_to_tsquery('simple', :query) "
+                "ORDER BY rank DESC LIMIT :limit OFFSET :offset"
+            )
+            params["query"] = query
+        else:
+            return SearchService._like_search(long_terms + short_terms, page, per_page)
+
+        # 宣告結果欄位，讓讀寫分離把它視為 SELECT
+        hits = db.session.execute(sql.columns(column('id'), column('rank')), params).all()
+        has_next = len(hits) > per_page
+        hits = hits[:per_page]
+
+        # 依排名順序取回完整資料（一次 IN 查詢）
+        messages = {
+            message.id: message
+            for message in ContactMessage.query.filter(ContactMessage.id.in_([hit.id for hit in hits]))
+        }
+        results = [(messages[hit.id], hit.rank) for hit in hits if hit.id in messages]
+        return results, has_next
+
+    @staticmethod
+    def _like_search(terms, page, per_page):
+        """
+        沒有可用全文檢索時的退路：每個詞都要出現在任一欄位（不分大小寫），由新到舊排序
+        需要掃描資料表，頁數由 SEARCH_MAX_PAGE 限制
+        """
+        conditions = [
+            or_(*(
+                getattr(ContactMessage, name).ilike(SearchService.like_pattern(term), escape='\\')
+                for name in SEARCH_COLUMNS
+            ))
+            for term in terms
+        ]
+        messages = (
+            ContactMessage.query.filter(*conditions)
+            .order_by(ContactMessage.id.desc())
+            .limit(per_page + 1).offset((page - 1) * per_page)
+            .all()
+        )
+        return [(message, None) for message in messages[:per_page]], len(messages) > per_page
+
+    @staticmethod
+    def rebuild_index():
+        """
+        重建全文檢索索引（匯入舊資料或索引損壞時使用）
+        :return: 是否有索引可重建（其他資料庫以 LIKE 搜尋，沒有索引）
+        """
+        dialect = db.engine.dialect.name
+        if dialect not in ('sqlite', 'postgresql'):
+            return False
+        with db.engine.begin() as conn:
+            if dialect == 'sqlite':
+                conn.execute(text("INSERT INTO contact_message_fts(contact_message_fts) VALUES ('rebuild')"))
+            else:
+                conn.execute(text("REINDEX INDEX ix_contact_message_fts"))
+        return True
+
+
+@click.command('search-rebuild')
+def search_rebuild_command():
+    """重建聯絡訊息的全文檢索索引"""
+    if SearchService.rebuild_index():
+        click.echo("✅ 全文檢索索引已重建")
+    else:
+        click.echo(f"⚠️ {db.engine.dialect.name} 沒有全文檢索索引，搜尋以 LIKE 比對")
@@ -0,0 +1,100 @@
+import logging
+import threading
+from app.database import db, async_db, primary
+from app.utils.cache import create_cache_backend, is_shared_backend
+
+logger = logging.getLogger(__name__)
+
+
+class UserCache:
+    """
+    序列化後用戶資料（to_dict）的讀穿快取
+    寫入用戶資料的地方必須呼叫 invalidate()
+    'lru' 後端只清除本行程的快取，多個 worker 時其他 worker 最多在 USER_CACHE_TTL 秒內回傳舊資料（見 check_workers）
+    """
+
+    def __init__(self, app=None):
+        self.backend = None
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """綁定應用並建立快取後端"""
+        self.backend = create_cache_backend(app.config, 'USER_CACHE')
+        app.extensions['user_cache'] = self
+
+    @staticmethod
+    def _key(user_id):
+        return f"user:{user_id}"
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def get_user_dict(self, user_id):
+        """
+        取得用戶資料字典，快取未命中時查詢資料庫
+        :return: dict 或 None（用戶不存在）
+        """
+        data = self.backend.get(self._key(user_id))
+        if data is not None:
+            self._count("hits")
+            return data
+
+        self._count("misses")
+        from app.models.user import User
+        # 從主庫回填，避免把副本上的舊資料快取到 TTL 結束
+        with primary():
+            user = db.session.get(User, user_id)
+        if not user:
+            return None
+
+        data = user.to_dict()
+        self.backend.set(self._key(user_id), data)
+        return data
+
+    async def get_user_dict_async(self, user_id):
+        """get_user_dict 的非同步版本，快取未命中時以 async_db 查詢"""
+        data = self.backend.get(self._key(user_id))
+        if data is not None:
+            self._count("hits")
+            return data
+
+        self._count("misses")
+        from app.models.user import User
+        async with async_db.session() as session:
+            user = await session.get(User, user_id)
+        if not user:
+            return None
+
+        data = user.to_dict()
+        self.backend.set(self._key(user_id), data)
+        return data
+
+    def invalidate(self, user_id):
+        """用戶資料變更後清除快取"""
+        self.backend.delete(self._key(user_id))
+        self._count("invalidations")
+
+    def check_workers(self, workers):
+        """多個 worker 時快取未共用只會造成有限時間的舊資料，記錄警告而不中止啟動"""
+        if workers > 1 and not is_shared_backend(self.backend):
+            logger.warning(
+                "%s 個 worker 各自保存用戶快取，更新或刪除用戶後其他 worker 最多 %s 秒內回傳舊資料與舊 ETag；"
+                "請設定 USER_CACHE_BACKEND=shared 與 CACHE_REDIS_URL",
+                workers, self.backend.ttl,
+            )
+
+    def stats(self):
+        """快取命中統計"""
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        stats["size"] = len(self.backend)
+        return stats
+
+
+user_cache = UserCache()
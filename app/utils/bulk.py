@@ -0,0 +1,64 @@
+import logging
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from app.database import db
+
+logger = logging.getLogger(__name__)
+
+
+def item_error(index, error):
+    """批次結果：單筆失敗"""
+    return {"index": index, "success": False, "error": error}
+
+
+def bulk_insert(model, rows, batch_size=500):
+    """
+    以 executemany 分批寫入，每批一個交易
+    某一批失敗時對半拆開重試，只有真正有問題的資料列會失敗
+    :param model: ORM 模型
+    :param rows: [(原始索引, 欄位字典)]
+    :param batch_size: 每個交易寫入的筆數
+    :return: {原始索引: 單筆結果}
+    """
+    results = {}
+    dialect = db.session.get_bind().dialect
+    # 支援時以 RETURNING 取回新 id（SQLite 3.35+、PostgreSQL）
+    returning = dialect.insert_executemany_returning_sort_by_parameter_order
+    statement = insert(model)
+    if returning:
+        statement = statement.returning(model.id, sort_by_parameter_order=True)
+
+    # 以堆疊依序處理：先寫入前面的批次，拆開的兩半也依原順序寫入
+    pending = [rows[start:start + batch_size] for start in range(0, len(rows), batch_size)][::-1]
+    while pending:
+        chunk = pending.pop()
+        try:
+            result = db.session.execute(statement, [values for _, values in chunk])
+            ids = result.scalars().all() if returning else [None] * len(chunk)
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            if len(chunk) > 1:
+                middle = len(chunk) // 2
+                pending += [chunk[middle:], chunk[:middle]]
+                continue
+            index, _ = chunk[0]
+            conflict = isinstance(e, IntegrityError)
+            logger.warning("%s 第 %s 筆寫入失敗: %s", model.__tablename__, index, e.__class__.__name__)
+            results[index] = item_error(index, "資料衝突" if conflict else "寫入失敗")
+            continue
+
+        for (index, _), new_id in zip(chunk, ids):
+            results[index] = {"index": index, "success": True, "id": new_id}
+    return results
+
+
+def bulk_summary(count, results):
+    """
+    依索引排序批次結果並統計
+    :param count: 原始筆數
+    :param results: {索引: 單筆結果}
+    """
+    ordered = [results[index] for index in range(count)]
+    created = sum(1 for item in ordered if item["success"])
+    return {"created": created, "failed": count - created, "results": ordered}
@@ -0,0 +1,138 @@
+import threading
+import time
+from collections import OrderedDict
+from app.utils.json_provider import dumps, loads
+
+
+class CacheBackend:
+    """快取後端介面：值必須是可 JSON 序列化的資料"""
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def __len__(self):
+        return 0
+
+
+class LRUCacheBackend(CacheBackend):
+    """行程內的 LRU + TTL 快取"""
+
+    def __init__(self, maxsize=10000, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SharedCacheBackend(CacheBackend):
+    """
+    多行程共用的快取，client 需提供 redis-py 相容的 get / set(ex=) / delete
+    值以 JSON 字串儲存
+    """
+
+    def __init__(self, client, ttl=60, prefix='flask_demo:'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return loads(raw) if raw is not None else None
+
+    def set(self, key, value):
+        self.client.set(self.prefix + key, dumps(value), ex=self.ttl)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+
+class LocalSharedClient:
+    """SharedCacheBackend 的本機替代品（開發與測試用），介面與 redis-py 相同"""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        with self._lock:
+            item = self._data.get(name)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[name]
+                return None
+            return value
+
+    def set(self, name, value, ex=None):
+        with self._lock:
+            expires_at = time.monotonic() + ex if ex else None
+            self._data[name] = (value.encode() if isinstance(value, str) else value, expires_at)
+        return True
+
+    def delete(self, *names):
+        with self._lock:
+            return sum(1 for name in names if self._data.pop(name, None) is not None)
+
+
+def is_shared_backend(backend):
+    """後端是否由多個行程共用（CACHE_REDIS_URL 未設定時 'shared' 只是本機替代品）"""
+    return isinstance(backend, SharedCacheBackend) and not isinstance(backend.client, LocalSharedClient)
+
+
+def create_cache_backend(config, prefix):
+    """
+    依配置建立快取後端
+    :param prefix: 配置鍵前綴，例如 'USER_CACHE' 會讀取 USER_CACHE_BACKEND 等
+    """
+    backend = config[f'{prefix}_BACKEND']
+    ttl = config[f'{prefix}_TTL']
+
+    if backend == 'lru':
+        return LRUCacheBackend(maxsize=config[f'{prefix}_SIZE'], ttl=ttl)
+
+    if backend == 'shared':
+        url = config.get('CACHE_REDIS_URL')
+        if url:
+            try:
+                import redis
+            except ImportError:
+                raise RuntimeError("使用 CACHE_REDIS_URL 需要安裝 redis 套件（pip install flask-demo[redis]）")
+            client = redis.Redis.from_url(url)
+        else:
+            client = LocalSharedClient()
+        return SharedCacheBackend(client, ttl=ttl)
+
+    raise ValueError(f"未知的快取後端: {backend}")
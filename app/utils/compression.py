@@ -0,0 +1,59 @@
+import gzip
+from flask import request
+
+# brotli 為選用依賴，未安裝時只提供 gzip
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def choose_encoding(accept_encodings):
+    """依 Accept-Encoding 選擇壓縮方式，優先 brotli"""
+    if brotli is not None and accept_encodings['br'] > 0:
+        return 'br'
+    if accept_encodings['gzip'] > 0:
+        return 'gzip'
+    return None
+
+
+def compress(data, encoding, config):
+    """以指定方式壓縮"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=config['COMPRESS_BROTLI_QUALITY'])
+    return gzip.compress(data, compresslevel=config['COMPRESS_LEVEL'])
+
+
+def init_compression(app):
+    """依 Accept-Encoding 壓縮超過 COMPRESS_MIN_SIZE 的文字響應"""
+
+    @app.after_request
+    def compress_response(response):
+        config = app.config
+        if (
+            not config['COMPRESS_ENABLED']
+            or response.direct_passthrough
+            or response.is_streamed
+            or response.status_code < 200
+            or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in config['COMPRESS_MIMETYPES']
+        ):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        data = response.get_data()
+        if len(data) < config['COMPRESS_MIN_SIZE']:
+            return response
+
+        encoding = choose_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+
+        response.set_data(compress(data, encoding, config))
+        response.headers['Content-Encoding'] = encoding
+        # 不同編碼的內容不同，強 ETag 需要區分
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(f"{etag}-{encoding}")
+        return response
@@ -0,0 +1,74 @@
+import hashlib
+from datetime import datetime
+from flask import request, current_app, make_response
+from sqlalchemy import func, select
+from app.database import db
+
+# 壓縮後的響應會在 ETag 加上編碼後綴（見 compression.py）
+ENCODING_SUFFIXES = ('gzip', 'br')
+
+
+def make_etag(*parts):
+    """由版本資訊產生強 ETag（不含引號），datetime 與其 ISO 字串會得到相同結果"""
+    raw = '|'.join(
+        '' if part is None else part.isoformat() if isinstance(part, datetime) else str(part)
+        for part in parts
+    )
+    return hashlib.blake2b(raw.encode('utf-8'), digest_size=12).hexdigest()
+
+
+def collection_version(model, *criteria):
+    """
+    以一次聚合查詢取得集合的版本
+    :return: (筆數, max(updated_at))
+    """
+    statement = select(func.count(model.id), func.max(model.updated_at))
+    if criteria:
+        statement = statement.where(*criteria)
+    return tuple(db.session.execute(statement).one())
+
+
+def page_version(items):
+    """
+    由已讀取的一頁資料取得版本，不需要額外查詢
+    :return: (各筆 id, max(updated_at))
+    """
+    return (
+        tuple(item.id for item in items),
+        max((item.updated_at for item in items if item.updated_at is not None), default=None),
+    )
+
+
+def is_fresh(etag):
+    """If-None-Match 是否符合（也接受壓縮後加上編碼後綴的 ETag）"""
+    if_none_match = request.if_none_match
+    if not if_none_match:
+        return False
+    if if_none_match.star_tag:
+        return True
+    return any(
+        if_none_match.contains(tag)
+        for tag in (etag, *(f"{etag}-{suffix}" for suffix in ENCODING_SUFFIXES))
+    )
+
+
+def not_modified(etag):
+    """304 響應，不含本文"""
+    response = current_app.response_class(status=304)
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response
+
+
+def conditional_response(etag, build):
+    """
+    符合 If-None-Match 時直接回 304，不呼叫 build
+    :param build: 產生完整響應的函數
+    """
+    if is_fresh(etag):
+        return not_modified(etag)
+    response = make_response(build())
+    if response.status_code == 200:
+        response.set_etag(etag)
+        response.cache_control.no_cache = True
+    return response
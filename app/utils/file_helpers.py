@@ -1,9 +1,15 @@
-from PIL import Image
+import io
+import logging
 import os
+import time
 import uuid
 from werkzeug.utils import secure_filename
 from flask import current_app
 
+logger = logging.getLogger(__name__)
+
+# Pillow 在處理圖片的函數內才載入，啟動與一般請求不需要付出匯入成本
+
 def allowed_file(filename):
     """檢查檔案類型是否允許"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in current_app.config['ALLOWED_EXTENSIONS']
@@ -28,43 +34,209 @@ def ensure_upload_folder(folder_name):
     os.makedirs(upload_folder, exist_ok=True)
     os.makedirs(avatar_folder, exist_ok=True)
 
-def resize_image(file_path, output_path, size=(150, 150)):
+# 暫存檔前綴，啟動時會清理殘留的暫存檔
+TEMP_PREFIX = 'temp_'
+
+def spool_upload(file, folder, threshold):
+    """
+    取得上傳檔案的內容來源
+    小於 threshold 的檔案直接讀入記憶體（回傳 bytes），不寫入磁碟；
+    較大的檔案才寫成暫存檔（回傳路徑）
+    :param file: werkzeug FileStorage
+    """
+    stream = file.stream
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(0)
+
+    if size <= threshold:
+        return stream.read()
+
+    temp_path = os.path.join(folder, f"{TEMP_PREFIX}{uuid.uuid4().hex}")
+    file.save(temp_path)
+    return temp_path
+
+def discard_upload(source):
+    """刪除 spool_upload 產生的暫存檔（如果有）"""
+    if isinstance(source, str) and os.path.exists(source):
+        os.remove(source)
+
+def atomic_save(img, output_path, format, **options):
+    """先寫入暫存檔再改名，避免留下寫到一半的檔案"""
+    folder, filename = os.path.split(output_path)
+    temp_path = os.path.join(folder, f"{TEMP_PREFIX}{uuid.uuid4().hex}_{filename}")
+    try:
+        img.save(temp_path, format, **options)
+        os.replace(temp_path, output_path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def sweep_temp_files(folders, max_age):
+    """
+    清理程式中斷後殘留的暫存檔
+    :param folders: 要檢查的資料夾列表
+    :param max_age: 只刪除超過此秒數的檔案，避免刪到其他行程正在使用的暫存檔
+    :return: 刪除的檔案數
+    """
+    removed = 0
+    cutoff = time.time() - max_age
+    for folder in folders:
+        if not os.path.isdir(folder):
+            continue
+        for entry in os.scandir(folder):
+            if not entry.name.startswith(TEMP_PREFIX) or not entry.is_file():
+                continue
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed += 1
+            except FileNotFoundError:
+                pass
+    return removed
+
+# 圖片像素上限（依標頭尺寸判斷，避免解壓縮炸彈）
+MAX_IMAGE_PIXELS = 50_000_000
+
+# 頭像輸出格式：格式名稱 -> (Pillow 格式, 副檔名, 儲存參數)
+AVATAR_FORMATS = {
+    'jpeg': ('JPEG', 'jpg', {'quality': 85, 'optimize': True}),
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+}
+
+def _decode_image(img, size, max_pixels):
+    """
+    檢查尺寸並以最省的方式解碼成 RGB 或灰階
+    :param img: 尚未解碼的 Image
+    :param size: 最大的目標尺寸，用於 JPEG 縮小解碼
+    """
+    from PIL import Image
+
+    # 只讀取了標頭，先檢查尺寸再解碼
+    width, height = img.size
+    if width * height > max_pixels:
+        raise ValueError(f"圖片尺寸過大: {width}x{height}")
+
+    # JPEG 直接以縮小的比例解碼（保留2倍餘裕給 LANCZOS）
+    if img.format == 'JPEG':
+        img.draft('RGB', (size[0] * 2, size[1] * 2))
+
+    # 調色盤模式無法用 LANCZOS 縮放，先轉換
+    if img.mode == 'P':
+        img = img.convert('RGBA' if 'transparency' in img.info else 'RGB')
+
+    # 只有真正含透明像素時才合成白色背景，完全不透明時直接去掉 alpha
+    if img.mode in ('RGBA', 'LA'):
+        alpha = img.getchannel('A')
+        if alpha.getextrema()[0] < 255:
+            background = Image.new('RGB', img.size, (255, 255, 255))
+            background.paste(img.convert('RGB'), mask=alpha)
+            return background
+        return img.convert('RGB')
+    if img.mode not in ('RGB', 'L'):
+        return img.convert('RGB')
+    return img
+
+def _fit_square(img, size):
+    """
+    保持比例縮放後置中貼到白色正方形背景
+    會直接縮小傳入的圖片，方便多尺寸時由大到小接續縮放
+    """
+    from PIL import Image
+
+    # reducing_gap 會先用 reduce() 快速縮小
+    img.thumbnail(size, Image.Resampling.LANCZOS, reducing_gap=2.0)
+
+    # 創建正方形背景並居中貼上（灰階圖片縮小後再轉換）
+    new_img = Image.new('RGB', size, (255, 255, 255))
+    paste_x = (size[0] - img.width) // 2
+    paste_y = (size[1] - img.height) // 2
+    new_img.paste(img if img.mode == 'RGB' else img.convert('RGB'), (paste_x, paste_y))
+    return new_img
+
+def resize_image(file_path, output_path, size=(150, 150), max_pixels=MAX_IMAGE_PIXELS):
     """
     縮放圖片到指定尺寸
     :param file_path: 原始圖片路徑
     :param output_path: 輸出圖片路徑
     :param size: 目標尺寸 (寬, 高)
+    :param max_pixels: 允許的最大像素數
     """
+    from PIL import Image
+
     try:
         with Image.open(file_path) as img:
-            # 轉換為RGB模式（處理RGBA或其他模式）
-            if img.mode in ('RGBA', 'LA', 'P'):
-                background = Image.new('RGB', img.size, (255, 255, 255))
-                if img.mode == 'P':
-                    img = img.convert('RGBA')
-                background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-                img = background
-            elif img.mode != 'RGB':
-                img = img.convert('RGB')
-
-            # 保持比例縮放
-            img.thumbnail(size, Image.Resampling.LANCZOS)
-
-            # 創建正方形背景
-            new_img = Image.new('RGB', size, (255, 255, 255))
-
-            # 居中貼上縮放後的圖片
-            paste_x = (size[0] - img.width) // 2
-            paste_y = (size[1] - img.height) // 2
-            new_img.paste(img, (paste_x, paste_y))
+            img = _decode_image(img, size, max_pixels)
+            new_img = _fit_square(img, size)
 
             # 保存圖片
-            new_img.save(output_path, 'JPEG', quality=85, optimize=True)
+            atomic_save(new_img, output_path, 'JPEG', quality=85, optimize=True)
             return True
     except Exception as e:
-        print(f"處理圖片時發生錯誤: {str(e)}")
+        logger.warning("處理圖片時發生錯誤: %s", e)
+        return False
+
+def avatar_rendition_filename(name, size, fmt='jpeg'):
+    """頭像各尺寸檔名，例如 <uuid>_150.jpg"""
+    return f"{name}_{size}.{AVATAR_FORMATS[fmt][1]}"
+
+def create_avatar_renditions(source, output_dir, name, sizes=(50, 150, 300),
+                             formats=('webp', 'jpeg'), max_pixels=MAX_IMAGE_PIXELS):
+    """
+    只解碼一次，輸出多種尺寸與格式的頭像
+    :param source: 原始圖片路徑或圖片內容（bytes）
+    :param output_dir: 輸出資料夾
+    :param name: 檔名前綴（不含副檔名）
+    :param sizes: 正方形邊長列表
+    :param formats: AVATAR_FORMATS 中的格式名稱
+    :return: 產生的檔名列表，失敗時回傳 False
+    """
+    from PIL import Image
+
+    written = []
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    try:
+        with Image.open(source) as img:
+            largest = max(sizes)
+            img = _decode_image(img, (largest, largest), max_pixels)
+
+            # 由大到小接續縮放，每個尺寸都從上一個結果縮小
+            for size in sorted(sizes, reverse=True):
+                square = _fit_square(img, (size, size))
+                for fmt in formats:
+                    pil_format, _, options = AVATAR_FORMATS[fmt]
+                    filename = avatar_rendition_filename(name, size, fmt)
+                    atomic_save(square, os.path.join(output_dir, filename), pil_format, **options)
+                    written.append(filename)
+            return written
+    except Exception as e:
+        logger.warning("處理圖片時發生錯誤: %s", e)
+        for filename in written:
+            os.remove(os.path.join(output_dir, filename))
         return False
 
+def remove_avatar_files(avatar_folder, avatar_filename):
+    """刪除頭像檔案（包含所有尺寸與格式）"""
+    if not avatar_filename:
+        return
+
+    # 舊版頭像是單一檔案
+    if '.' in avatar_filename:
+        candidates = [avatar_filename]
+    else:
+        candidates = [
+            avatar_rendition_filename(avatar_filename, size, fmt)
+            for size in current_app.config['AVATAR_RENDITION_SIZES']
+            for fmt in current_app.config['AVATAR_FORMATS']
+        ]
+
+    for filename in candidates:
+        path = os.path.join(avatar_folder, filename)
+        if os.path.exists(path):
+            os.remove(path)
+
 def create_thumbnail(file_path, output_path, size=(50, 50)):
     """創建縮圖"""
     return resize_image(file_path, output_path, size)
\ No newline at end of file
@@ -0,0 +1,60 @@
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from uuid import UUID
+from flask.json.provider import JSONProvider
+
+# orjson 為選用依賴（pip install flask-demo[speed]），未安裝時使用標準庫
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS if orjson else 0
+
+
+def _default(obj):
+    """標準庫無法序列化的型別"""
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, (Decimal, UUID)):
+        return str(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps_bytes(obj):
+    """序列化成 UTF-8 bytes（datetime 輸出 ISO 8601）"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=ORJSON_OPTIONS)
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def dumps(obj):
+    """序列化成字串"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=ORJSON_OPTIONS).decode('utf-8')
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(',', ':'))
+
+
+def loads(s):
+    """反序列化"""
+    if orjson is not None:
+        return orjson.loads(s)
+    return json.loads(s)
+
+
+class FastJSONProvider(JSONProvider):
+    """
+    Flask JSON provider：有 orjson 時使用 orjson，否則使用精簡輸出的標準庫
+    不排序鍵值、不縮排，datetime 直接輸出 ISO 8601
+    """
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj)
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps_bytes(obj), mimetype='application/json')
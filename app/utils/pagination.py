@@ -0,0 +1,110 @@
+from flask import Response, stream_with_context, current_app
+from app.database import db
+from app.utils.json_provider import dumps
+
+
+def parse_limit(value, default=None, maximum=None):
+    """解析每頁筆數，超過上限時截斷"""
+    default = default or current_app.config['API_PAGE_SIZE']
+    maximum = maximum or current_app.config['API_MAX_PAGE_SIZE']
+    if value in (None, ''):
+        return default
+    limit = int(value)
+    if limit < 1:
+        raise ValueError("limit 必須大於 0")
+    return min(limit, maximum)
+
+
+def parse_cursor(value):
+    """解析游標（上一頁最後一筆的 id）"""
+    if value in (None, ''):
+        return None
+    cursor = int(value)
+    if cursor < 0:
+        raise ValueError("after 不可為負數")
+    return cursor
+
+
+def parse_fields(value, allowed):
+    """
+    解析稀疏欄位參數（?fields=id,name）
+    :param allowed: 可選欄位名稱
+    :return: 依要求順序的欄位列表；未指定時回傳 None（輸出完整資料）
+    """
+    if value in (None, ''):
+        return None
+    fields = list(dict.fromkeys(field.strip() for field in value.split(',') if field.strip()))
+    unknown = [field for field in fields if field not in allowed]
+    if unknown:
+        raise ValueError(f"不支援的欄位 {', '.join(unknown)}，可用欄位: {', '.join(allowed)}")
+    if not fields:
+        raise ValueError("fields 不可為空")
+    return fields
+
+
+def projection_columns(model, fields):
+    """
+    依 model.API_FIELDS 取得要查詢的資料表欄位，一律包含主鍵（游標）與 updated_at（ETag）
+    """
+    names = dict.fromkeys(['id', 'updated_at'])
+    for field in fields:
+        names.update(dict.fromkeys(model.API_FIELDS[field]))
+    return [getattr(model, name) for name in names]
+
+
+def keyset_page(query, column, after=None, limit=50, descending=False):
+    """
+    以主鍵做游標分頁（keyset pagination）
+    :param query: 基礎查詢
+    :param column: 排序用的遞增欄位（通常是 id）
+    :param after: 上一頁最後一筆的值
+    :param limit: 每頁筆數
+    :param descending: 是否由新到舊排序
+    :return: (items, next_cursor)
+    """
+    if after is not None:
+        query = query.filter(column < after if descending else column > after)
+
+    # 多取一筆用來判斷是否還有下一頁
+    order = column.desc() if descending else column.asc()
+    items = query.order_by(order).limit(limit + 1).all()
+    if len(items) > limit:
+        items = items[:limit]
+        return items, getattr(items[-1], column.key)
+    return items, None
+
+
+def stream_query(query, serialize, fmt='ndjson', batch_size=None, rows=False, message="Success"):
+    """
+    以生成器串流整個結果集，分批讀取資料列以維持固定的記憶體用量
+    :param query: 已排序的 select() 語句
+    :param serialize: 將單筆資料轉為字典的函數
+    :param fmt: 'ndjson' 或 'json'
+    :param batch_size: 每批讀取的資料列數
+    :param rows: 查詢的是多個欄位時為 True，serialize 會收到資料列而非 ORM 物件
+    :param message: 'json' 格式外層的 message，外層欄位與 success_response 相同
+    """
+    batch_size = batch_size or current_app.config['API_STREAM_BATCH_SIZE']
+    statement = query.execution_options(yield_per=batch_size)
+
+    def results():
+        return db.session.execute(statement) if rows else db.session.scalars(statement)
+
+    def generate_ndjson():
+        for row in results():
+            yield dumps(serialize(row)) + '\n'
+
+    def generate_json():
+        # 外層以同一個 dumps 產生（精簡輸出），在 data 的空陣列處切開，中間串流資料列
+        head, tail = dumps({"success": True, "message": message, "data": []}).rsplit('[]', 1)
+        yield head + '['
+        first = True
+        for row in results():
+            chunk = dumps(serialize(row))
+            yield chunk if first else ',' + chunk
+            first = False
+        yield ']' + tail
+
+    if fmt == 'ndjson':
+        return Response(stream_with_context(generate_ndjson()), mimetype='application/x-ndjson')
+    return Response(stream_with_context(generate_json()), mimetype='application/json')
@@ -0,0 +1,60 @@
+import hashlib
+import os
+import re
+from flask import request
+from werkzeug.security import safe_join
+
+# uuid 產生的檔名內容不會變（例如 <uuid>.jpg、<uuid>_150.webp），可以永久快取
+CONTENT_ADDRESSED_RE = re.compile(r'^[0-9a-f]{32}(_\d+)?\.[a-z0-9]+$')
+
+# (路徑, 修改時間) -> 內容雜湊
+_hash_cache = {}
+
+def is_content_addressed(filename):
+    """檔名是否由 generate_unique_filename 產生"""
+    return bool(CONTENT_ADDRESSED_RE.match(os.path.basename(filename)))
+
+def immutable_cache_control(response, max_age):
+    """標記為永久不變的資源"""
+    response.cache_control.no_cache = None
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    response.cache_control.immutable = True
+    return response
+
+def file_hash(path):
+    """取得檔案內容的短雜湊，檔案修改後會重新計算"""
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+    key = (path, mtime)
+    digest = _hash_cache.get(key)
+    if digest is None:
+        with open(path, 'rb') as f:
+            digest = hashlib.md5(f.read(), usedforsecurity=False).hexdigest()[:12]
+        _hash_cache[key] = digest
+    return digest
+
+def register_static_versioning(app):
+    """
+    為 url_for('static', ...) 自動加上 ?v=<內容雜湊>，
+    帶版本參數的請求回應永久快取標頭，內容改變時網址也會改變
+    """
+    @app.url_defaults
+    def add_static_version(endpoint, values):
+        if endpoint != 'static' or 'v' in values or 'filename' not in values:
+            return
+        digest = file_hash(os.path.join(app.static_folder, values['filename']))
+        if digest:
+            values['v'] = digest
+
+    @app.after_request
+    def cache_versioned_static(response):
+        # 只有版本參數等於目前內容雜湊時才永久快取，過期或猜測的 ?v= 仍走一般的條件式請求
+        if request.endpoint == 'static' and 'v' in request.args and response.status_code == 200:
+            path = safe_join(app.static_folder, request.view_args.get('filename', ''))
+            if path and request.args['v'] == file_hash(path):
+                immutable_cache_control(response, app.config['IMMUTABLE_MAX_AGE'])
+        return response
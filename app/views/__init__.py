@@ -4,8 +4,17 @@ def register_blueprints(app):
     from app.views.auth import auth_bp
     from app.views.contact import contact_bp
     from app.views.api import api_bp
+    from app.views.uploads import uploads_bp
+    from app.views.metrics import metrics_bp
     
     app.register_blueprint(main_bp)
     app.register_blueprint(auth_bp)
     app.register_blueprint(contact_bp)
-    app.register_blueprint(api_bp)
\ No newline at end of file
+    app.register_blueprint(api_bp)
+    app.register_blueprint(uploads_bp)
+    app.register_blueprint(metrics_bp)
+
+    # 非同步端點需要 asgiref 與 asyncio 資料庫驅動
+    if app.config['ASYNC_ENABLED']:
+        from app.views.api_async import api_async_bp
+        app.register_blueprint(api_async_bp)
\ No newline at end of file
@@ -3,22 +3,37 @@ from app.database import db
 from app.models.user import User
 from app.models.contact import ContactMessage
 from datetime import datetime
-from werkzeug.datastructures import FileStorage
-from app.utils.file_helpers import allowed_file, generate_unique_filename, resize_image, ensure_upload_folder
-from flask import current_app
-import os
+from app.utils.file_helpers import (
+    allowed_file, generate_unique_filename, ensure_upload_folder, remove_avatar_files,
+    spool_upload, discard_upload
+)
+from app.utils.pagination import (
+    parse_limit, parse_cursor, parse_fields, projection_columns, keyset_page, stream_query
+)
+from app.utils.conditional import make_etag, collection_version, page_version, conditional_response
+from app.services.image_queue import image_queue, QueueFullError
+from app.services.user_cache import user_cache
+from app.services.auth_service import AuthService
+from app.services.contact_service import ContactService
+from app.services.contact_buffer import contact_buffer
+from app.services.admission import admission
+from app.services.api_tokens import api_tokens, token_required
+from app.services.search_service import SearchService
+from flask import current_app, url_for, g, session
+from sqlalchemy import select
 
 # 創建API Blueprint
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
 # 統一的JSON響應格式
-def success_response(data=None, message="Success", status_code=200):
-    """成功響應格式"""
+def success_response(data=None, message="Success", status_code=200, **meta):
+    """成功響應格式（額外的 meta 欄位如 next_cursor 會併入最外層）"""
     response = {
         "success": True,
         "message": message,
         "data": data
     }
+    response.update(meta)
     return jsonify(response), status_code
 
 def error_response(message="Error", status_code=400, errors=None):
@@ -30,6 +45,85 @@ def error_response(message="Error", status_code=400, errors=None):
     }
     return jsonify(response), status_code
 
+def bulk_response(summary, label):
+    """批次端點的響應：全部成功 201、部分成功 207、全部失敗 400（錯誤格式，逐筆結果放在 errors）"""
+    message = f"成功創建{summary['created']}{label}，失敗{summary['failed']}筆"
+    if summary["created"] == 0 and summary["failed"] > 0:
+        return error_response(message, status_code=400, errors=summary)
+    status_code = 201 if summary["failed"] == 0 else 207
+    return success_response(data=summary, message=message, status_code=status_code)
+
+def get_bulk_items():
+    """
+    讀取批次請求的資料列表
+    :return: (items, error_response)
+    """
+    items = request.get_json(silent=True)
+    if isinstance(items, dict):
+        items = items.get('items')
+    if not isinstance(items, list) or not items:
+        return None, error_response("請提供JSON陣列", status_code=400)
+    limit = current_app.config['BULK_MAX_ITEMS']
+    if len(items) > limit:
+        return None, error_response(f"單次最多{limit}筆", status_code=413)
+    return items, None
+
+def collection_etag(*versions):
+    """列表的 ETag：各版本資訊（page_version 或 collection_version）加上請求路徑與參數"""
+    return make_etag(request.full_path, *(part for version in versions for part in version))
+
+def paginated_response(model, label):
+    """
+    列表端點共用的分頁邏輯
+    - ?limit=50&after=<id> ：游標分頁，回傳 next_cursor
+    - ?stream=ndjson|json ：串流整個結果集
+    - ?fields=id,name ：只查詢並輸出指定欄位（資料列為輕量 tuple，不經過 ORM 物件）
+    - If-None-Match ：資料沒有變動時回 304（分頁以該頁資料產生 ETag，不需要額外查詢）
+    """
+    try:
+        fields = parse_fields(request.args.get('fields'), model.API_FIELDS)
+    except ValueError as e:
+        return error_response(f"欄位參數錯誤: {str(e)}", status_code=400)
+
+    if fields is None:
+        query, serialize = model.query, lambda row: row.to_dict()
+    else:
+        columns = projection_columns(model, fields)
+        query, serialize = db.session.query(*columns), lambda row: model.serialize_row(row, fields)
+
+    stream = request.args.get('stream')
+    if stream:
+        if stream not in ('ndjson', 'json'):
+            return error_response("stream 只支援 ndjson 或 json", status_code=400)
+        # 串流會讀完整個資料表，以一次聚合查詢作為集合版本
+        etag = collection_etag(collection_version(model))
+        if fields is None:
+            return conditional_response(
+                etag, lambda: stream_query(select(model).order_by(model.id), serialize, fmt=stream)
+            )
+        return conditional_response(
+            etag, lambda: stream_query(select(*columns).order_by(model.id), serialize, fmt=stream, rows=True)
+        )
+
+    try:
+        limit = parse_limit(request.args.get('limit'))
+        after = parse_cursor(request.args.get('after'))
+    except ValueError as e:
+        return error_response(f"分頁參數錯誤: {str(e)}", status_code=400)
+
+    items, next_cursor = keyset_page(query, model.id, after=after, limit=limit)
+
+    def build():
+        data = [serialize(item) for item in items]
+        return success_response(data=data, message=f"找到{len(data)}{label}", next_cursor=next_cursor)
+
+    # next_cursor 也納入 ETag：最後一頁之後新增資料時，該頁內容不變但 next_cursor 會由 None 變為有值
+    return conditional_response(collection_etag(page_version(items), (next_cursor,)), build)
+
+def user_etag(user_data):
+    """單一用戶的 ETag（取自快取中的資料，不需要查詢資料庫）"""
+    return make_etag('user', user_data['id'], user_data.get('updated_at'))
+
 # 測試API端點
 @api_bp.route('/test', methods=['GET'])
 def test_api():
@@ -42,18 +136,84 @@ def test_api():
 # === 用戶管理API ===
 @api_bp.route('/users', methods=['GET'])
 def get_users():
-    """獲取所有用戶"""
-    users = User.query.all()
-    user_data = [user.to_dict() for user in users]
-    return success_response(data=user_data, message=f"找到{len(user_data)}個用戶")
+    """
+    獲取用戶列表（游標分頁）
+    - ?include=messages ：附帶每位用戶的訊息與 message_count
+    - ?messages_limit=5 ：每位用戶最多附帶幾則最新訊息（預設 USER_MESSAGES_DEFAULT_LIMIT）
+    """
+    include = request.args.get('include')
+    if not include:
+        return paginated_response(User, "個用戶")
+    if include != 'messages':
+        return error_response("include 只支援 messages", status_code=400)
+    if request.args.get('fields') or request.args.get('stream'):
+        return error_response("include 不可與 fields 或 stream 一起使用", status_code=400)
+
+    try:
+        limit = parse_limit(request.args.get('limit'))
+        after = parse_cursor(request.args.get('after'))
+        per_user = parse_limit(
+            request.args.get('messages_limit'),
+            default=current_app.config['USER_MESSAGES_DEFAULT_LIMIT'],
+            maximum=current_app.config['USER_MESSAGES_MAX_LIMIT'],
+        )
+    except ValueError as e:
+        return error_response(f"分頁參數錯誤: {str(e)}", status_code=400)
+
+    # 不論用戶數量，固定為 3 個查詢：用戶、每位用戶最新的 per_user 則訊息、訊息數
+    users, next_cursor = keyset_page(User.query, User.id, after=after, limit=limit)
+    ContactService.attach_recent_messages(users, per_user)
+    counts = ContactService.count_messages_by_user([user.id for user in users])
+
+    # ETag 取自這一頁的用戶、附帶的訊息、訊息數與 next_cursor
+    messages = [message for user in users for message in user.messages]
+    etag = collection_etag(page_version(users), page_version(messages), sorted(counts.items()), (next_cursor,))
+    return conditional_response(etag, lambda: build_users_with_messages(users, next_cursor, counts))
+
+def build_users_with_messages(users, next_cursor, counts):
+    """產生附帶訊息的用戶列表"""
+    data = [
+        dict(
+            user.to_dict(),
+            messages=[message.to_dict() for message in user.messages],
+            message_count=counts.get(user.id, 0),
+        )
+        for user in users
+    ]
+    return success_response(data=data, message=f"找到{len(data)}個用戶", next_cursor=next_cursor)
 
 @api_bp.route('/users/<int:user_id>', methods=['GET'])
 def get_user(user_id):
     """取得特定用戶"""
-    user = User.query.get(user_id)
-    if not user:
+    user_data = user_cache.get_user_dict(user_id)
+    if not user_data:
         return error_response(message="用戶不存在", status_code=404)
-    return success_response(data=user.to_dict(), message="用戶資料獲取成功")
+    return conditional_response(
+        user_etag(user_data), lambda: success_response(data=user_data, message="用戶資料獲取成功")
+    )
+
+@api_bp.route('/users/<int:user_id>/messages', methods=['GET'])
+def get_user_messages(user_id):
+    """取得特定用戶的訊息（由新到舊，游標分頁）"""
+    if not user_cache.get_user_dict(user_id):
+        return error_response(message="用戶不存在", status_code=404)
+
+    try:
+        limit = parse_limit(request.args.get('limit'))
+        after = parse_cursor(request.args.get('after'))
+    except ValueError as e:
+        return error_response(f"分頁參數錯誤: {str(e)}", status_code=400)
+
+    count, last_modified = collection_version(ContactMessage, ContactMessage.user_id == user_id)
+
+    def build():
+        messages, next_cursor = ContactService.get_messages_page(after=after, limit=limit, user_id=user_id)
+        data = [message.to_dict() for message in messages]
+        return success_response(
+            data=data, message=f"找到{len(data)}則訊息", next_cursor=next_cursor, message_count=count
+        )
+
+    return conditional_response(collection_etag((count, last_modified)), build)
 
 @api_bp.route('/users', methods=['POST'])
 def create_user():
@@ -71,20 +231,22 @@ def create_user():
 
     if not all([username, email, password]):
         return error_response(message="請提供用戶名、電子郵件和密碼", status_code=400)
+    if not all(isinstance(value, str) for value in (username, email, password)):
+        return error_response(message="用戶名、電子郵件和密碼必須是字串", status_code=400)
     
     # 檢查用戶名是否已存在
     if User.query.filter_by(username=username).first():
         return error_response(message="用戶名已存在", status_code=409)
     
     # 檢查電子郵件是否已存在
-    if User.query.filter_by(email=email).first():
+    if User.find_by_email(email):
         return error_response(message="電子郵件已存在", status_code=409)
     
-    # 創建新用戶
+    # 創建新用戶（密碼雜湊名額已滿時由 PasswordHasherBusy 錯誤處理回 503）
+    new_user = User(username=username, email=email)
+    new_user.set_password(password)
+
     try:
-        new_user = User(username=username, email=email)
-        new_user.set_password(password)
-        
         db.session.add(new_user)
         db.session.commit()
         
@@ -103,6 +265,9 @@ def update_user(user_id):
     data = request.get_json()
     if not data:
         return error_response("請提供JSON資料", status_code=400)
+    for field in ('username', 'email', 'password'):
+        if field in data and not (isinstance(data[field], str) and data[field]):
+            return error_response(f"{field} 必須是非空字串", status_code=400)
     
     # 更新用戶名（如果提供）
     if 'username' in data:
@@ -115,7 +280,7 @@ def update_user(user_id):
     # 更新電子郵件（如果提供）
     if 'email' in data:
         # 檢查新電子郵件是否與其他用戶衝突
-        existing_user = User.query.filter_by(email=data['email']).first()
+        existing_user = User.find_by_email(data['email'])
         if existing_user and existing_user.id != user_id:
             return error_response("電子郵件已存在", status_code=409)
         user.email = data['email']
@@ -126,6 +291,9 @@ def update_user(user_id):
     
     try:
         db.session.commit()
+        user_cache.invalidate(user_id)
+        if 'password' in data:
+            api_tokens.revoke_user(user_id)
         return success_response(data=user.to_dict(), message="用戶資料更新成功")
     except Exception as e:
         db.session.rollback()
@@ -145,18 +313,47 @@ def delete_user(user_id):
         # 刪除用戶
         db.session.delete(user)
         db.session.commit()
+        user_cache.invalidate(user_id)
+        api_tokens.revoke_user(user_id)
         return success_response(data=user_data, message="用戶刪除成功")
     except Exception as e:
         db.session.rollback()
         return error_response("刪除用戶失敗", status_code=500)
     
+@api_bp.route('/users/bulk', methods=['POST'])
+def bulk_create_users():
+    """批次創建用戶"""
+    items, error = get_bulk_items()
+    if error:
+        return error
+
+    summary = AuthService.bulk_create_users(items, current_app.config['BULK_BATCH_SIZE'])
+    return bulk_response(summary, "個用戶")
+    
 # === 聯絡人管理API ===
 @api_bp.route('/contacts', methods=['GET'])
 def get_contacts():
-    """獲取所有聯絡人"""
-    contacts = ContactMessage.query.all()
-    contacts_data = [contact.to_dict() for contact in contacts]
-    return success_response(data=contacts_data, message=f"找到{len(contacts_data)}則訊息")
+    """獲取聯絡人列表（游標分頁）"""
+    return paginated_response(ContactMessage, "則訊息")
+
+@api_bp.route('/contacts/search', methods=['GET'])
+def search_contacts():
+    """全文檢索聯絡訊息（依相關度排序）"""
+    try:
+        query, page, results, has_next = SearchService.search_page(request.args, current_app.config)
+    except ValueError as e:
+        return error_response(f"分頁參數錯誤: {str(e)}", status_code=400)
+
+    if results is None:
+        return error_response("請提供搜尋詞", status_code=400)
+
+    data = [dict(message.to_dict(), rank=rank) for message, rank in results]
+    return success_response(
+        data=data,
+        message=f"找到{len(data)}則訊息",
+        page=page,
+        next_page=page + 1 if has_next else None
+    )
 
 @api_bp.route('/contacts', methods=['POST'])
 def create_contact():
@@ -172,17 +369,33 @@ def create_contact():
 
     if not all([name, email, message]):
         return error_response("請提供姓名、電子郵件和訊息", status_code=400)
+    if not all(isinstance(value, str) for value in (name, email, message)):
+        return error_response("姓名、電子郵件和訊息必須是字串", status_code=400)
     
     try:
-        new_contact = ContactMessage(name=name, email=email, message=message)
-        db.session.add(new_contact)
-        db.session.commit()
+        new_contact, queued = ContactService.submit_message(name, email, message)
+        if queued:
+            return success_response(
+                data={"name": name, "email": email, "message": message, "queued": True},
+                message="聯絡訊息已接收，稍後寫入",
+                status_code=202
+            )
         
         return success_response(data=new_contact.to_dict(), message="聯絡訊息創建成功", status_code=201)
     except Exception as e:
         db.session.rollback()
         return error_response("創建聯絡訊息失敗", status_code=500)
 
+@api_bp.route('/contacts/bulk', methods=['POST'])
+def bulk_create_contacts():
+    """批次創建聯絡訊息"""
+    items, error = get_bulk_items()
+    if error:
+        return error
+
+    summary = ContactService.bulk_create_messages(items, current_app.config['BULK_BATCH_SIZE'])
+    return bulk_response(summary, "則訊息")
+
 # === 認證API ===    
 @api_bp.route('/auth/register', methods=['POST'])
 def api_register():
@@ -198,20 +411,22 @@ def api_register():
 
     if not all([username, email, password]):
         return error_response("請提供用戶名、電子郵件和密碼", status_code=400)
+    if not all(isinstance(value, str) for value in (username, email, password)):
+        return error_response("用戶名、電子郵件和密碼必須是字串", status_code=400)
     
     # 檢查用戶名是否已存在
     if User.query.filter_by(username=username).first():
         return error_response("用戶名已存在", status_code=409)
     
     # 檢查電子郵件是否已存在
-    if User.query.filter_by(email=email).first():
+    if User.find_by_email(email):
         return error_response("電子郵件已存在", status_code=409)
     
-    # 創建新用戶
+    # 創建新用戶（密碼雜湊名額已滿時由 PasswordHasherBusy 錯誤處理回 503）
+    new_user = User(username=username, email=email)
+    new_user.set_password(password)
+
     try:
-        new_user = User(username=username, email=email)
-        new_user.set_password(password)
-        
         db.session.add(new_user)
         db.session.commit()
 
@@ -241,32 +456,55 @@ def api_login():
     if not username or not password:
         return error_response("請提供用戶名和密碼", status_code=400)
     
-    # 查找用戶
-    user = User.query.filter_by(username=username).first()
+    # 驗證用戶（必要時升級密碼雜湊），名額已滿時由 PasswordHasherBusy 錯誤處理回 503
+    user, authenticated = AuthService.authenticate_user(username, password)
 
-    if not user or not user.check_password(password):
+    if not authenticated:
         return error_response("用戶名或密碼錯誤", status_code=401)
     
+    token, expires_in = api_tokens.issue(user.id)
     return success_response(
         data={
             "user": user.to_dict(),
-            "token": f"user_token_{user.id}",
+            "token": token,
+            "token_type": "Bearer",
+            "expires_in": expires_in,
             "login_time": datetime.now().isoformat()
         },
         message="登入成功"
     )
 
+@api_bp.route('/auth/logout', methods=['POST'])
+@token_required
+def api_logout():
+    """API用戶登出（撤銷目前的權杖；以會話認證時清除會話）"""
+    if g.api_token:
+        api_tokens.revoke(g.api_token)
+    else:
+        session.clear()
+    return success_response(message="登出成功")
+
+@api_bp.route('/auth/tokens/stats', methods=['GET'])
+@token_required
+def token_stats():
+    """API 權杖驗證與撤銷統計"""
+    return success_response(data=api_tokens.stats(), message="權杖統計獲取成功")
+
 @api_bp.route('/auth/user/<int:user_id>', methods=['GET'])
+@token_required
 def get_user_profile(user_id):
     """取得用戶資料（需要認證）"""
-    user = User.query.get(user_id)
-    if not user:
+    user_data = user_cache.get_user_dict(user_id)
+    if not user_data:
         return error_response("用戶不存在", status_code=404)
     
-    return success_response(data=user.to_dict(), message="用戶資料獲取成功")
+    return conditional_response(
+        user_etag(user_data), lambda: success_response(data=user_data, message="用戶資料獲取成功")
+    )
 
 # === 文件上傳API ===
 @api_bp.route('/users/<int:user_id>/avatar', methods=['POST'])
+@token_required
 def upload_avatar(user_id):
     """上傳用戶頭像"""
     # 確保上傳目錄存在
@@ -291,55 +529,65 @@ def upload_avatar(user_id):
     if not allowed_file(file.filename):
         return error_response("不支援的文件格式，請使用: png, jpg, jpeg, gif, webp", status_code=400)
     
-    temp_path = None
+    source = None
     try:
         # 生成唯一文件名
         unique_filename = generate_unique_filename(file.filename)
 
-        # 臨時保存原始文件
-        temp_path = os.path.join(current_app.config['UPLOAD_FOLDER'], f"temp_{unique_filename}")
-        file.save(temp_path)
-
-        # 處理後的頭像路徑
-        avatar_path = os.path.join(current_app.config['AVATAR_FOLDER'], unique_filename)
-
-        # 縮放圖片
-        if resize_image(temp_path, avatar_path, current_app.config['AVATAR_SIZE']):
-            # 刪除臨時文件
-            os.remove(temp_path)
-
-            # 刪除舊頭像（如果存在）
-            if user.avatar_filename:
-                old_avatar_path = os.path.join(current_app.config['AVATAR_FOLDER'], user.avatar_filename)
-                if os.path.exists(old_avatar_path):
-                    os.remove(old_avatar_path)
-
-            # 更新用戶頭像文件名
-            user.avatar_filename = unique_filename
-            db.session.commit()
-
-            return success_response(
-                data={
-                    "user": user.to_dict(),
-                    "avatar_url": user.get_avatar_url()
-                },
-                message="頭像上傳成功",
-                status_code=201
-            )
-        else:
-            # 圖片處理失敗，刪除臨時文件
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
-            return error_response("圖片處理失敗", status_code=500)
-        
+        # 小檔案直接讀入記憶體，大檔案才寫入暫存檔
+        source = spool_upload(file, current_app.config['UPLOAD_FOLDER'], current_app.config['UPLOAD_SPOOL_THRESHOLD'])
+
+        # 交給背景行程池產生各尺寸頭像，立即回應
+        avatar_name = unique_filename.rsplit('.', 1)[0]
+        job_id = image_queue.submit_avatar(user.id, source, current_app.config['AVATAR_FOLDER'], avatar_name)
+    except QueueFullError:
+        discard_upload(source)
+        response, status_code = error_response("圖片處理忙碌中，請稍後再試", status_code=503)
+        response.headers['Retry-After'] = str(current_app.config['IMAGE_RETRY_AFTER'])
+        return response, status_code
     except Exception as e:
         # 清理臨時文件
-        if temp_path and os.path.exists(temp_path):
-            os.remove(temp_path)
-        db.session.rollback()
+        discard_upload(source)
         return error_response(f"上傳失敗: {str(e)}", status_code=500)
+
+    return success_response(
+        data={
+            "job_id": job_id,
+            "status": "queued",
+            "status_url": url_for('api.get_job', job_id=job_id)
+        },
+        message="頭像已上傳，處理中",
+        status_code=202
+    )
+
+@api_bp.route('/cache/stats', methods=['GET'])
+@token_required
+def cache_stats():
+    """用戶快取命中統計"""
+    return success_response(data=user_cache.stats(), message="快取統計獲取成功")
+
+@api_bp.route('/admission/stats', methods=['GET'])
+@token_required
+def admission_stats():
+    """准入控制與速率限制統計"""
+    return success_response(data=admission.stats(), message="准入控制統計獲取成功")
+
+@api_bp.route('/contacts/ingest/stats', methods=['GET'])
+@token_required
+def contact_ingest_stats():
+    """聯絡訊息 write-behind 佇列深度與寫入延遲"""
+    return success_response(data=contact_buffer.stats(), message="寫入佇列統計獲取成功")
+
+@api_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """查詢背景工作狀態"""
+    job = image_queue.get_job(job_id)
+    if not job:
+        return error_response("工作不存在或已過期", status_code=404)
+    return success_response(data=job, message="工作狀態獲取成功")
     
 @api_bp.route('/users/<int:user_id>/avatar', methods=['DELETE'])
+@token_required
 def delete_avatar(user_id):
     """刪除用戶頭像"""
     user = User.query.get(user_id)
@@ -350,14 +598,13 @@ def delete_avatar(user_id):
         return error_response("用戶沒有設置頭像", status_code=404)
     
     try:
-        # 刪除頭像文件
-        avatar_path = os.path.join(current_app.config['AVATAR_FOLDER'], user.avatar_filename)
-        if os.path.exists(avatar_path):
-            os.remove(avatar_path)
+        # 刪除頭像文件（所有尺寸與格式）
+        remove_avatar_files(current_app.config['AVATAR_FOLDER'], user.avatar_filename)
 
         # 清除資料庫記錄
         user.avatar_filename = None
         db.session.commit()
+        user_cache.invalidate(user_id)
 
         return success_response(
             data={"user": user.to_dict()},
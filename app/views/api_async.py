@@ -0,0 +1,136 @@
+import asyncio
+from flask import Blueprint, request, current_app, url_for
+from sqlalchemy import select
+from app.database import async_db
+from app.models.user import User
+from app.models.contact import ContactMessage
+from app.utils.file_helpers import (
+    allowed_file, generate_unique_filename, ensure_upload_folder, spool_upload, discard_upload
+)
+from app.utils.pagination import parse_limit, parse_cursor
+from app.utils.conditional import conditional_response
+from app.services.image_queue import image_queue, QueueFullError
+from app.services.user_cache import user_cache
+from app.services.contact_service import ContactService
+from app.services.api_tokens import token_required
+from app.views.api import success_response, error_response, user_etag
+
+# 非同步版本的 API（ASYNC_ENABLED 時註冊），回應格式與 /api 相同
+api_async_bp = Blueprint('api_async', __name__, url_prefix='/api/async')
+
+async def paginated_response_async(model, label):
+    """列表端點的非同步版本（?limit=50&after=<id>）"""
+    try:
+        limit = parse_limit(request.args.get('limit'))
+        after = parse_cursor(request.args.get('after'))
+    except ValueError as e:
+        return error_response(f"分頁參數錯誤: {str(e)}", status_code=400)
+
+    statement = select(model).order_by(model.id).limit(limit + 1)
+    if after is not None:
+        statement = statement.where(model.id > after)
+    async with async_db.session() as session:
+        items = (await session.scalars(statement)).all()
+
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = items[-1].id
+    data = [item.to_dict() for item in items]
+    return success_response(data=data, message=f"找到{len(data)}{label}", next_cursor=next_cursor)
+
+# === 用戶 ===
+@api_async_bp.route('/users', methods=['GET'])
+async def get_users():
+    """獲取用戶列表（游標分頁）"""
+    return await paginated_response_async(User, "個用戶")
+
+@api_async_bp.route('/users/<int:user_id>', methods=['GET'])
+async def get_user(user_id):
+    """取得特定用戶"""
+    user_data = await user_cache.get_user_dict_async(user_id)
+    if not user_data:
+        return error_response(message="用戶不存在", status_code=404)
+    return conditional_response(
+        user_etag(user_data), lambda: success_response(data=user_data, message="用戶資料獲取成功")
+    )
+
+# === 聯絡訊息 ===
+@api_async_bp.route('/contacts', methods=['GET'])
+async def get_contacts():
+    """獲取所有聯絡訊息（游標分頁）"""
+    return await paginated_response_async(ContactMessage, "則訊息")
+
+@api_async_bp.route('/contacts', methods=['POST'])
+async def create_contact():
+    """創建新聯絡訊息"""
+    data = request.get_json(silent=True)
+    if not data:
+        return error_response("請提供JSON資料", status_code=400)
+
+    name = data.get('name')
+    email = data.get('email')
+    message = data.get('message')
+    if not all([name, email, message]):
+        return error_response("請提供姓名、電子郵件和訊息", status_code=400)
+    if not all(isinstance(value, str) for value in (name, email, message)):
+        return error_response("姓名、電子郵件和訊息必須是字串", status_code=400)
+
+    try:
+        new_contact, queued = await ContactService.submit_message_async(name, email, message)
+    except Exception:
+        return error_response("創建聯絡訊息失敗", status_code=500)
+
+    if queued:
+        return success_response(
+            data={"name": name, "email": email, "message": message, "queued": True},
+            message="聯絡訊息已接收，稍後寫入",
+            status_code=202
+        )
+    return success_response(data=new_contact.to_dict(), message="聯絡訊息創建成功", status_code=201)
+
+# === 頭像 ===
+@api_async_bp.route('/users/<int:user_id>/avatar', methods=['POST'])
+@token_required
+async def upload_avatar(user_id):
+    """上傳用戶頭像（寫入暫存檔在執行緒中進行，不阻塞事件迴圈）"""
+    if not await user_cache.get_user_dict_async(user_id):
+        return error_response("用戶不存在", status_code=404)
+
+    if 'avatar' not in request.files:
+        return error_response("請選擇頭像文件", status_code=400)
+
+    file = request.files['avatar']
+    if file.filename == '':
+        return error_response("未選擇文件", status_code=400)
+    if not allowed_file(file.filename):
+        return error_response("不支援的文件格式，請使用: png, jpg, jpeg, gif, webp", status_code=400)
+
+    config = current_app.config
+    source = None
+    try:
+        # asyncio.to_thread 會複製 context，執行緒中仍可使用 current_app
+        await asyncio.to_thread(ensure_upload_folder, 'avatar')
+        unique_filename = generate_unique_filename(file.filename)
+        source = await asyncio.to_thread(spool_upload, file, config['UPLOAD_FOLDER'], config['UPLOAD_SPOOL_THRESHOLD'])
+
+        avatar_name = unique_filename.rsplit('.', 1)[0]
+        job_id = image_queue.submit_avatar(user_id, source, config['AVATAR_FOLDER'], avatar_name)
+    except QueueFullError:
+        await asyncio.to_thread(discard_upload, source)
+        response, status_code = error_response("圖片處理忙碌中，請稍後再試", status_code=503)
+        response.headers['Retry-After'] = str(config['IMAGE_RETRY_AFTER'])
+        return response, status_code
+    except Exception as e:
+        await asyncio.to_thread(discard_upload, source)
+        return error_response(f"上傳失敗: {str(e)}", status_code=500)
+
+    return success_response(
+        data={
+            "job_id": job_id,
+            "status": "queued",
+            "status_url": url_for('api.get_job', job_id=job_id)
+        },
+        message="頭像已上傳，處理中",
+        status_code=202
+    )
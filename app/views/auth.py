@@ -1,6 +1,8 @@
 from flask import Blueprint, render_template, request, session, redirect, url_for
 from app.database import db
 from app.models.user import User
+from app.services.auth_service import AuthService
+from app.services.password_hasher import PasswordHasherBusy
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -24,7 +26,7 @@ def register():
             return render_template('register.html', message="用戶名已存在")
         
         # 檢查信箱是否已存在
-        if User.query.filter_by(email=email).first():
+        if User.find_by_email(email):
             return render_template('register.html', message="信箱已被註冊")
         
         # 創建新用戶
@@ -47,10 +49,13 @@ def login():
         if not username or not password:
             return render_template('login.html', message="請填寫用戶名和密碼")
         
-        # 查找用戶
-        user = User.query.filter_by(username=username).first()
+        # 驗證用戶（必要時升級密碼雜湊）
+        try:
+            user, authenticated = AuthService.authenticate_user(username, password)
+        except PasswordHasherBusy:
+            return render_template('login.html', message="登入人數過多，請稍後再試"), 503
 
-        if user and user.check_password(password):
+        if authenticated:
             # 登入成功，設置會話
             session['user_id'] = user.id
             session['username'] = user.username
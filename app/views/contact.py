@@ -1,6 +1,7 @@
-from flask import Blueprint, render_template, request
-from app.database import db
-from app.models.contact import ContactMessage
+from datetime import datetime, timedelta
+from flask import Blueprint, render_template, request, stream_template, current_app
+from app.services.contact_service import ContactService
+from app.utils.pagination import parse_limit, parse_cursor
 
 contact_bp = Blueprint('contact', __name__)
 
@@ -14,11 +15,12 @@ def contact():
 
         # 簡單的驗證
         if name and email and message:
-            # 保存到資料庫
-            contact_msg = ContactMessage(name=name, email=email, message=message)
-            db.session.add(contact_msg)
-            db.session.commit()
-            success_message = f"謝謝 {name}！我們已收到你的訊息並保存到資料庫"
+            # 保存到資料庫（啟用 write-behind 時稍後批次寫入）
+            _, queued = ContactService.submit_message(name, email, message)
+            if queued:
+                success_message = f"謝謝 {name}！我們已收到你的訊息"
+            else:
+                success_message = f"謝謝 {name}！我們已收到你的訊息並保存到資料庫"
             return render_template("contact.html", message=success_message)
         else:
             error_message = "請填寫所有欄位"
@@ -26,8 +28,46 @@ def contact():
     # GET請求時顯示空白表單
     return render_template("contact.html")
 
+def _parse_date(value):
+    """解析 YYYY-MM-DD 格式的日期"""
+    if not value:
+        return None
+    return datetime.strptime(value, '%Y-%m-%d')
+
 @contact_bp.route("/messages")
 def messages():
-    # 從資料庫取出所有訊息
-    all_messages = ContactMessage.query.all()
-    return render_template("messages.html", messages=all_messages)
\ No newline at end of file
+    # 篩選條件
+    filters = {
+        'start': request.args.get('start', ''),
+        'end': request.args.get('end', ''),
+        'user_id': request.args.get('user_id', ''),
+    }
+
+    try:
+        limit = parse_limit(
+            request.args.get('limit'),
+            default=current_app.config['MESSAGES_PAGE_SIZE'],
+            maximum=current_app.config['MESSAGES_MAX_PAGE_SIZE'],
+        )
+        after = parse_cursor(request.args.get('after'))
+        start = _parse_date(filters['start'])
+        end = _parse_date(filters['end'])
+        user_id = int(filters['user_id']) if filters['user_id'] else None
+    except ValueError:
+        return render_template("messages.html", messages=[], filters=filters, error="篩選條件格式錯誤"), 400
+
+    # 結束日期包含當天
+    if end is not None:
+        end += timedelta(days=1)
+
+    # 只取一頁資料，再以串流方式渲染模板
+    page_messages, next_cursor = ContactService.get_messages_page(
+        after=after, limit=limit, start=start, end=end, user_id=user_id
+    )
+    return stream_template(
+        "messages.html",
+        messages=page_messages,
+        next_cursor=next_cursor,
+        limit=limit,
+        filters=filters,
+    )
\ No newline at end of file
@@ -1,5 +1,6 @@
-from flask import Blueprint, render_template, request
+from flask import Blueprint, render_template, request, current_app
 from markupsafe import escape
+from app.services.search_service import SearchService
 
 main_bp = Blueprint('main', __name__)
 
@@ -9,8 +10,17 @@ def hello_world():
 
 @main_bp.route("/search")
 def search():
-    query = request.args.get('q', '沒有搜索詞')
-    return render_template("search.html", query=query)
+    try:
+        query, page, results, has_next = SearchService.search_page(request.args, current_app.config)
+    except ValueError:
+        return render_template("search.html", query=request.args.get('q', ''), error="頁碼錯誤"), 400
+    return render_template(
+        "search.html",
+        query=query,
+        page=page,
+        results=results,
+        has_next=has_next,
+    )
 
 @main_bp.route("/user/<username>/<int:user_id>")
 def user_profile(username, user_id):
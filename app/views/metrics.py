@@ -0,0 +1,14 @@
+from flask import Blueprint, Response, current_app, request, abort
+from app.services.metrics import metrics
+
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.route('/metrics')
+def prometheus_metrics():
+    """Prometheus 抓取端點（本行程的數據，只允許 METRICS_ALLOWED_IPS 中的來源）"""
+    if not metrics.enabled:
+        abort(404)
+    allowed = current_app.config['METRICS_ALLOWED_IPS']
+    if '*' not in allowed and request.remote_addr not in allowed:
+        abort(403)
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,53 @@
+import mimetypes
+import os
+from flask import Blueprint, current_app, request, send_from_directory, abort
+from werkzeug.security import safe_join
+from app.utils.static_files import is_content_addressed, immutable_cache_control
+
+uploads_bp = Blueprint('uploads', __name__)
+
+def _negotiate_format(filename):
+    """頭像 JPEG 有對應的 WebP 版本時，依 Accept 標頭提供較小的 WebP"""
+    if not filename.endswith('.jpg') or 'webp' not in current_app.config['AVATAR_FORMATS']:
+        return filename, False
+
+    webp_filename = filename[:-len('.jpg')] + '.webp'
+    accepts_webp = dict(request.accept_mimetypes).get('image/webp', 0) > 0
+    if accepts_webp and os.path.exists(safe_join(current_app.config['UPLOAD_FOLDER'], webp_filename) or ''):
+        return webp_filename, True
+    return filename, True
+
+def _accel_redirect(filename):
+    """交給前端 nginx 傳送檔案（X-Accel-Redirect）"""
+    path = safe_join(current_app.config['UPLOAD_FOLDER'], filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+
+    response = current_app.response_class(status=200)
+    response.headers['X-Accel-Redirect'] = current_app.config['UPLOAD_X_ACCEL_REDIRECT'].rstrip('/') + '/' + filename
+    response.content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    return response
+
+@uploads_bp.route('/uploads/<path:filename>')
+def uploaded_file(filename):
+    """
+    上傳文件服務
+    - uuid 檔名內容不會變，回應永久快取
+    - 其他檔案以 ETag / Last-Modified 回應 304
+    - 設定 UPLOAD_X_ACCEL_REDIRECT 或 USE_X_SENDFILE 時交給前端代理傳送
+    """
+    filename, negotiated = _negotiate_format(filename)
+
+    if current_app.config['UPLOAD_X_ACCEL_REDIRECT']:
+        response = _accel_redirect(filename)
+    else:
+        # conditional=True 會處理 If-None-Match / If-Modified-Since
+        response = send_from_directory(current_app.config['UPLOAD_FOLDER'], filename, conditional=True, etag=True)
+
+    if is_content_addressed(filename):
+        immutable_cache_control(response, current_app.config['IMMUTABLE_MAX_AGE'])
+    else:
+        response.cache_control.no_cache = True
+    if negotiated:
+        response.vary.add('Accept')
+    return response
@@ -0,0 +1,8 @@
+import os
+from app import create_asgi_app
+
+# 獲取配置環境
+config_name = os.environ.get('FLASK_ENV', 'development')
+
+# ASGI 應用實例：uvicorn asgi:application
+application = create_asgi_app(config_name)
@@ -0,0 +1 @@
+"""效能基準測試（python -m benchmarks.<模組名稱> 執行）"""
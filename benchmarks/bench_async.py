@@ -0,0 +1,235 @@
+"""
+比較同步 WSGI 與 ASGI 非同步模式在大量並行連線下的吞吐量與記憶體
+
+    python -m benchmarks.bench_async [--connections 64] [--threads 8] [--seconds 5] [--client-delay 0.05]
+
+兩種伺服器都在子行程中執行，使用相同數量的執行緒（--threads）：
+- sync：固定大小執行緒池的 WSGI 伺服器（相當於 gthread worker），呼叫 /api
+- asgi：uvicorn + create_asgi_app（ASGI_THREADS=--threads），呼叫 /api/async
+
+情境：
+- profile：GET 用戶資料
+- contact_ingest：POST 聯絡訊息，客戶端送出標頭後延遲 --client-delay 秒才送本文（模擬慢速客戶端）
+
+輸出每個情境的 throughput、p50/p99 延遲與伺服器 RSS（MB）。
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from config import config, DevelopmentConfig
+
+PROFILE = 'bench-async'
+
+
+def make_profile(database_path):
+    """產生指向測試資料庫的配置（父行程與伺服器子行程共用）"""
+    config[PROFILE] = type('BenchAsyncConfig', (DevelopmentConfig,), {
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{database_path}",
+        'DEBUG': False,
+        'ASYNC_ENABLED': True,
+        'METRICS_ENABLED': False,
+        'SQLITE_PRAGMAS': {'journal_mode': 'WAL', 'synchronous': 'NORMAL', 'busy_timeout': 5000},
+    })
+    return PROFILE
+
+
+# === 伺服器（子行程） ===
+def serve_sync(port, threads):
+    import logging
+    from werkzeug.serving import BaseWSGIServer
+    from app import create_app
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+
+    class PooledWSGIServer(BaseWSGIServer):
+        """以固定大小的執行緒池處理連線"""
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.pool = ThreadPoolExecutor(max_workers=threads)
+
+        def process_request(self, request, client_address):
+            self.pool.submit(self._process, request, client_address)
+
+        def _process(self, request, client_address):
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    server = PooledWSGIServer('127.0.0.1', port, create_app(PROFILE))
+    server.request_queue_size = 1024
+    server.serve_forever()
+
+
+def serve_asgi(port, threads):
+    import uvicorn
+    from app import create_asgi_app
+
+    os.environ['ASGI_THREADS'] = str(threads)
+    uvicorn.run(create_asgi_app(PROFILE), host='127.0.0.1', port=port, log_level='warning', backlog=1024)
+
+
+# === 客戶端 ===
+async def http_request(port, method, path, body=b'', delay=0):
+    """送出一個 HTTP/1.1 請求並讀完響應，回傳狀態碼"""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    head = (
+        f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n"
+    )
+    writer.write(head.encode())
+    await writer.drain()
+    if delay:
+        await asyncio.sleep(delay)
+    if body:
+        writer.write(body)
+        await writer.drain()
+    status_line = await reader.readline()
+    await reader.read()
+    writer.close()
+    return int(status_line.split()[1])
+
+
+async def run_scenario(port, connections, seconds, make_request):
+    latencies = []
+    errors = 0
+    deadline = time.monotonic() + seconds
+
+    async def worker(index):
+        nonlocal errors
+        count = 0
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                status = await make_request(index, count)
+            except OSError:
+                status = 0
+            count += 1
+            if 200 <= status < 400:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+
+    start = time.monotonic()
+    await asyncio.gather(*(worker(i) for i in range(connections)))
+    elapsed = time.monotonic() - start
+
+    latencies.sort()
+    percentile = lambda p: round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 2) if latencies else None
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": percentile(0.50),
+        "p99_ms": percentile(0.99),
+    }
+
+
+def rss_mb(pid):
+    """讀取行程目前的 RSS（Linux）"""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"伺服器未在 {timeout} 秒內啟動")
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def seed(users):
+    from sqlalchemy import insert
+    from app import create_app
+    from app.database import db
+    from app.models import User
+
+    app = create_app(PROFILE)
+    with app.app_context():
+        db.session.execute(insert(User), [
+            {"username": f"user{i}", "email": f"user{i}@example.com", "password_hash": "x"}
+            for i in range(users)
+        ])
+        db.session.commit()
+
+
+def bench_server(mode, args, database_path):
+    port = free_port()
+    process = subprocess.Popen([
+        sys.executable, '-m', 'benchmarks.bench_async', '--serve', mode,
+        '--port', str(port), '--threads', str(args.threads), '--database', database_path,
+    ])
+    try:
+        wait_for_port(port)
+        prefix = '/api/async' if mode == 'asgi' else '/api'
+        body = json.dumps({"name": "bench", "email": "bench@example.com", "message": "x" * 200}).encode()
+        scenarios = {
+            "profile": lambda i, n: http_request(port, 'GET', f"{prefix}/users/{(i + n) % args.users + 1}"),
+            "contact_ingest": lambda i, n: http_request(port, 'POST', f"{prefix}/contacts", body, args.client_delay),
+        }
+        results = []
+        for name, make_request in scenarios.items():
+            result = asyncio.run(run_scenario(port, args.connections, args.seconds, make_request))
+            results.append({"server": mode, "scenario": name, **result, "server_rss_mb": rss_mb(process.pid)})
+        return results
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--connections', type=int, default=64)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--client-delay', type=float, default=0.05)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--serve', choices=('sync', 'asgi'), help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--database', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        make_profile(args.database)
+        (serve_sync if args.serve == 'sync' else serve_asgi)(args.port, args.threads)
+        return
+
+    results = []
+    with tempfile.TemporaryDirectory() as folder:
+        database_path = os.path.join(folder, 'bench.db')
+        make_profile(database_path)
+        seed(args.users)
+        for mode in ('sync', 'asgi'):
+            results.extend(bench_server(mode, args, database_path))
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
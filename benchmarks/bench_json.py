@@ -0,0 +1,116 @@
+"""
+API 響應的序列化時間與傳輸大小
+
+    python -m benchmarks.bench_json [--rows 10000] [--repeat 5]
+
+- 序列化：比較 Flask 預設 JSON provider、標準庫精簡輸出與 orjson（若已安裝）
+- 傳輸大小：以測試客戶端取得 /api/users 與 /api/contacts，比較不壓縮、gzip、brotli
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import insert
+from config import config, DevelopmentConfig
+from app import create_app
+from app.database import db
+from app.models import User, ContactMessage
+from app.utils import json_provider
+
+
+def seed(rows):
+    """寫入測試用的用戶與聯絡訊息"""
+    now = datetime.utcnow()
+    db.session.execute(insert(User), [
+        {"username": f"user{i}", "email": f"user{i}@example.com",
+         "password_hash": "x", "created_at": now - timedelta(minutes=i)}
+        for i in range(rows)
+    ])
+    db.session.execute(insert(ContactMessage), [
+        {"name": f"聯絡人{i}", "email": f"contact{i}@example.com",
+         "message": "你好，我想詢問關於訂單的問題。" * 4, "created_at": now - timedelta(minutes=i)}
+        for i in range(rows)
+    ])
+    db.session.commit()
+
+
+def timed(func, repeat):
+    """回傳最快一次的毫秒數"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return round(best * 1000, 2)
+
+
+def bench_serializers(app, model, repeat):
+    with app.test_request_context():
+        items = [item.to_dict() for item in model.query.all()]
+    envelope = {"success": True, "message": "ok", "data": items}
+
+    # 舊版：to_dict 內先轉成 ISO 字串，再交給 Flask 預設 provider（排序鍵值）
+    legacy_items = [
+        dict(item, created_at=item["created_at"].isoformat() if item["created_at"] else None)
+        for item in items
+    ]
+    legacy_provider = DefaultJSONProvider(app)
+    legacy_envelope = {"success": True, "message": "ok", "data": legacy_items}
+
+    results = {
+        "flask_default_ms": timed(lambda: legacy_provider.dumps(legacy_envelope), repeat),
+        "stdlib_compact_ms": timed(
+            lambda: json.dumps(envelope, default=json_provider._default, ensure_ascii=False, separators=(',', ':')),
+            repeat,
+        ),
+    }
+    if json_provider.orjson is not None:
+        results["orjson_ms"] = timed(lambda: json_provider.dumps_bytes(envelope), repeat)
+    return results
+
+
+def bench_wire(client, path):
+    sizes = {}
+    for label, encoding in (("identity", "identity"), ("gzip", "gzip"), ("br", "br")):
+        response = client.get(path, headers={"Accept-Encoding": encoding})
+        if label != "identity" and response.headers.get("Content-Encoding") != label:
+            continue
+        sizes[f"{label}_bytes"] = len(response.get_data())
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        config['bench-json'] = type('BenchJSONConfig', (DevelopmentConfig,), {
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(folder, 'bench.db')}",
+            'DEBUG': False,
+            'API_MAX_PAGE_SIZE': args.rows,
+        })
+        app = create_app('bench-json')
+        with app.app_context():
+            seed(args.rows)
+
+        client = app.test_client()
+        results = []
+        for name, model in (("users", User), ("contacts", ContactMessage)):
+            path = f"/api/{name}?limit={args.rows}"
+            results.append({
+                "endpoint": path,
+                "rows": args.rows,
+                **bench_serializers(app, model, args.repeat),
+                **bench_wire(client, path),
+            })
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
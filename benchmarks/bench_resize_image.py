@@ -0,0 +1,109 @@
+"""
+比較 resize_image 新舊解碼流程的延遲與峰值記憶體
+
+    python -m benchmarks.bench_resize_image [--repeat 5]
+
+每種組合在獨立的子行程中執行，峰值 RSS 以 ru_maxrss 扣除載入後的基準值。
+測試圖片同樣在子行程中產生，避免主行程的峰值記憶體被子行程繼承。
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from PIL import Image
+from app.utils.file_helpers import resize_image
+
+
+def legacy_resize_image(file_path, output_path, size=(150, 150)):
+    """舊版流程：原尺寸解碼、轉換模式後才縮圖"""
+    with Image.open(file_path) as img:
+        if img.mode in ('RGBA', 'LA', 'P'):
+            background = Image.new('RGB', img.size, (255, 255, 255))
+            if img.mode == 'P':
+                img = img.convert('RGBA')
+            background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
+            img = background
+        elif img.mode != 'RGB':
+            img = img.convert('RGB')
+        img.thumbnail(size, Image.Resampling.LANCZOS)
+        new_img = Image.new('RGB', size, (255, 255, 255))
+        new_img.paste(img, ((size[0] - img.width) // 2, (size[1] - img.height) // 2))
+        new_img.save(output_path, 'JPEG', quality=85, optimize=True)
+        return True
+
+
+IMPLEMENTATIONS = {
+    'legacy': legacy_resize_image,
+    'current': resize_image,
+}
+
+# (名稱, 格式, 模式, 尺寸)
+SAMPLES = [
+    ('photo_jpeg', 'JPEG', 'RGB', (4000, 3000)),
+    ('gray_jpeg', 'JPEG', 'L', (4000, 3000)),
+    ('opaque_png', 'PNG', 'RGBA', (3000, 2000)),
+    ('palette_gif', 'GIF', 'P', (2000, 2000)),
+]
+
+
+def _max_rss_kb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def make_sample(folder, name, fmt, mode, dimensions):
+    """產生帶有漸層的測試圖片（純色圖片壓縮率太高，不具代表性）"""
+    path = os.path.join(folder, f"{name}.{fmt.lower()}")
+    gradient = Image.linear_gradient('L').resize(dimensions)
+    img = Image.merge('RGB', (gradient, gradient.rotate(90), gradient.transpose(Image.Transpose.FLIP_LEFT_RIGHT)))
+    if mode in ('RGBA', 'L'):
+        img = img.convert(mode)
+    elif mode == 'P':
+        img = img.convert('P', palette=Image.Palette.ADAPTIVE)
+    img.save(path, fmt)
+    return path
+
+
+def _run(impl_name, path, repeat, queue):
+    func = IMPLEMENTATIONS[impl_name]
+    output = path + f".{impl_name}.out.jpg"
+    baseline = _max_rss_kb()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(path, output)
+        timings.append((time.perf_counter() - start) * 1000)
+    os.remove(output)
+    queue.put({
+        "median_ms": round(sorted(timings)[len(timings) // 2], 2),
+        "min_ms": round(min(timings), 2),
+        "peak_rss_delta_kb": _max_rss_kb() - baseline,
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context('spawn')
+    results = []
+    with tempfile.TemporaryDirectory() as folder:
+        with ctx.Pool(1) as pool:
+            paths = pool.starmap(make_sample, [(folder, *sample) for sample in SAMPLES])
+        for (name, *_), path in zip(SAMPLES, paths):
+            for impl_name in IMPLEMENTATIONS:
+                queue = ctx.Queue()
+                proc = ctx.Process(target=_run, args=(impl_name, path, args.repeat, queue))
+                proc.start()
+                result = queue.get()
+                proc.join()
+                results.append({"sample": name, "impl": impl_name, **result})
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+冷啟動時間：每次在新的子行程中匯入並建立應用，再處理第一個請求
+
+    python -m benchmarks.bench_startup [--repeat 10] [--output startup.json]
+
+比較兩種啟動方式（資料庫結構已事先由 db-upgrade 建立）：
+- lazy：正式環境的啟動路徑，AUTO_MIGRATE 關閉，Pillow 等模組延遲載入
+- eager：舊的啟動路徑，啟動時 create_all + 套用遷移並載入 Pillow
+
+輸出各階段的 p50/p90 毫秒數、啟動後的 RSS，以及第一個請求後是否已載入 Pillow。
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from benchmarks.stats import summarize, environment
+
+# 在子行程中執行，輸出一行 JSON
+CHILD = r'''
+import json, os, sys, time
+start = time.perf_counter()
+if os.environ['BENCH_MODE'] == 'eager':
+    from PIL import Image
+from app import create_app
+imported = time.perf_counter()
+app = create_app('production')
+created = time.perf_counter()
+response = app.test_client().get('/api/test')
+first_request = time.perf_counter()
+assert response.status_code == 200, response.status_code
+with open('/proc/self/status') as f:
+    rss = next((int(line.split()[1]) for line in f if line.startswith('VmRSS:')), 0)
+print(json.dumps({
+    "import_s": imported - start,
+    "create_app_s": created - imported,
+    "first_request_s": first_request - created,
+    "total_s": first_request - start,
+    "rss_kb": rss,
+    "pil_loaded": 'PIL.Image' in sys.modules,
+}))
+'''
+
+STAGES = ('import_s', 'create_app_s', 'first_request_s', 'total_s')
+
+
+def run_child(mode, database_path):
+    env = dict(
+        os.environ,
+        BENCH_MODE=mode,
+        DATABASE_URL=f"sqlite:///{database_path}",
+        AUTO_MIGRATE='1' if mode == 'eager' else '0',
+        # production 配置不接受預設密鑰
+        SECRET_KEY=os.environ.get('SECRET_KEY', 'bench-startup-secret'),
+    )
+    output = subprocess.run(
+        [sys.executable, '-c', CHILD], env=env, capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def prepare_database(database_path):
+    """先建立資料庫結構，兩種方式都從同一個已遷移的資料庫啟動"""
+    subprocess.run(
+        [sys.executable, '-c', 'from app import create_app; create_app("development")'],
+        env=dict(os.environ, DATABASE_URL=f"sqlite:///{database_path}"), check=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    results = {"environment": environment(), "startup": []}
+    with tempfile.TemporaryDirectory() as folder:
+        database_path = os.path.join(folder, 'startup.db')
+        prepare_database(database_path)
+        for mode in ('lazy', 'eager'):
+            # 交錯執行一次暖機，讓檔案系統快取對兩種方式一致
+            run_child(mode, database_path)
+            runs = [run_child(mode, database_path) for _ in range(args.repeat)]
+            result = {"mode": mode}
+            for stage in STAGES:
+                summary = summarize([run[stage] for run in runs], elapsed=None)
+                result[stage.replace('_s', '_ms')] = {"p50": summary["p50_ms"], "p90": summary["p90_ms"]}
+            result["rss_mb"] = round(sorted(run["rss_kb"] for run in runs)[len(runs) // 2] / 1024, 1)
+            result["pil_loaded"] = runs[-1]["pil_loaded"]
+            results["startup"].append(result)
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""
+以固定亂數種子產生測試資料：用戶、聯絡訊息與合成頭像
+
+    python -m benchmarks.dataset --database /tmp/bench.db [--users 1000] [--contacts 10000] [--avatars 50]
+
+相同的參數與種子會產生相同的資料，方便比較不同版本的結果。
+所有用戶的密碼都是 PASSWORD（只雜湊一次，避免產生資料花費數分鐘）。
+"""
+import argparse
+import io
+import json
+import os
+import random
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+from config import config, DevelopmentConfig
+
+PASSWORD = 'bench-password'
+
+WORDS = ["訂單", "退貨", "發票", "運費", "帳號", "密碼", "優惠", "會員", "客服", "配送",
+         "order", "refund", "invoice", "shipping", "account", "coupon", "support", "delivery"]
+
+
+def make_profile(name, database_path, base=DevelopmentConfig, **overrides):
+    """產生指向測試資料庫的配置並註冊到 config"""
+    folder = os.path.dirname(os.path.abspath(database_path))
+    config[name] = type(f'{name.title().replace("-", "")}Config', (base,), {
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.abspath(database_path)}",
+        'DEBUG': False,
+        'TESTING': True,
+        'UPLOAD_FOLDER': os.path.join(folder, 'uploads'),
+        'AVATAR_FOLDER': os.path.join(folder, 'uploads', 'avatars'),
+        # 負載下大量的慢查詢記錄會干擾輸出與結果
+        'SLOW_QUERY_SECONDS': None,
+        # 所有請求都來自同一個 IP，速率限制會讓負載情境失真
+        'RATE_LIMIT_ENABLED': False,
+        **overrides,
+    })
+    return name
+
+
+def synthetic_avatar(rng, size=(1200, 900)):
+    """產生帶有漸層與雜訊的 JPEG（純色圖片壓縮率太高，不具代表性）"""
+    from PIL import Image
+
+    gradient = Image.linear_gradient('L').resize(size)
+    noise = Image.effect_noise(size, rng.randint(20, 80))
+    img = Image.merge('RGB', (gradient, noise, gradient.rotate(rng.choice((90, 180, 270)))))
+    buffer = io.BytesIO()
+    img.save(buffer, 'JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def seed_dataset(app, users=1000, contacts=10000, avatars=0, seed=42, batch_size=5000):
+    """
+    寫入測試資料（資料庫需為空）
+    :param avatars: 產生頭像的用戶數（會實際跑 create_avatar_renditions）
+    :return: 資料摘要
+    """
+    from app.database import db
+    from app.migrations import upgrade_database
+    from app.models import User, ContactMessage
+    from app.services.password_hasher import password_hasher
+    from app.utils.file_helpers import create_avatar_renditions
+
+    rng = random.Random(seed)
+    now = datetime(2025, 1, 1)
+
+    with app.app_context():
+        # 不依賴 AUTO_MIGRATE，正式環境配置也能產生資料
+        db.create_all()
+        upgrade_database()
+        password_hash = password_hasher.hash(PASSWORD)
+        user_rows = [
+            {
+                "username": f"user{i}",
+                "email": f"user{i}@example.com",
+                "password_hash": password_hash,
+                "created_at": now - timedelta(minutes=rng.randint(0, 525600)),
+            }
+            for i in range(1, users + 1)
+        ]
+        for start in range(0, len(user_rows), batch_size):
+            db.session.execute(insert(User), user_rows[start:start + batch_size])
+
+        for start in range(0, contacts, batch_size):
+            db.session.execute(insert(ContactMessage), [
+                {
+                    "name": f"聯絡人{i}",
+                    "email": f"contact{i}@example.com",
+                    "message": ' '.join(rng.choices(WORDS, k=rng.randint(5, 60))),
+                    "created_at": now - timedelta(seconds=rng.randint(0, 31536000)),
+                    # 約七成的訊息屬於某位用戶
+                    "user_id": rng.randint(1, users) if users and rng.random() < 0.7 else None,
+                }
+                for i in range(start, min(start + batch_size, contacts))
+            ])
+        db.session.commit()
+
+        avatar_folder = app.config['AVATAR_FOLDER']
+        os.makedirs(avatar_folder, exist_ok=True)
+        for user_id in range(1, min(avatars, users) + 1):
+            name = f"bench_{user_id}"
+            if create_avatar_renditions(
+                synthetic_avatar(rng), avatar_folder, name,
+                app.config['AVATAR_RENDITION_SIZES'], app.config['AVATAR_FORMATS'],
+            ):
+                db.session.get(User, user_id).avatar_filename = name
+        db.session.commit()
+
+    return {"users": users, "contacts": contacts, "avatars": min(avatars, users), "seed": seed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--database', required=True)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--contacts', type=int, default=10000)
+    parser.add_argument('--avatars', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    from app import create_app
+    app = create_app(make_profile('bench-dataset', args.database))
+    summary = seed_dataset(app, args.users, args.contacts, args.avatars, args.seed)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == '__main__':
+    main()
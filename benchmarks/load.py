@@ -0,0 +1,148 @@
+"""
+以測試客戶端在行程內對 API 施加負載
+
+    python -m benchmarks.load [--users 1000] [--contacts 10000] [--threads 8] [--seconds 5]
+                              [--scenario login_storm ...] [--profile production] [--output load.json]
+
+情境：
+- login_storm：POST /api/auth/login（密碼雜湊）
+- profile_polling：GET /api/users/<id>，帶上次的 ETag
+- contact_ingestion：POST /api/contacts
+- list_users / list_contacts / list_contacts_fields：GET 列表端點（游標分頁、稀疏欄位）
+
+每個情境輸出 p50/p90/p99 延遲、每秒完成數與狀態碼分布（非 2xx/304 計為 errors）。
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import Counter
+from config import DevelopmentConfig, ProductionConfig
+from benchmarks.dataset import PASSWORD, make_profile, seed_dataset
+from benchmarks.stats import summarize, environment
+
+PROFILES = {'development': DevelopmentConfig, 'production': ProductionConfig}
+
+
+def login_storm(client, rng, state, users):
+    user_id = rng.randint(1, users)
+    return client.post('/api/auth/login', json={"username": f"user{user_id}", "password": PASSWORD})
+
+
+def profile_polling(client, rng, state, users):
+    # 每個執行緒輪詢少數幾位用戶，模擬前端定時刷新
+    user_id = rng.randint(1, min(users, 20))
+    headers = {'If-None-Match': state[user_id]} if user_id in state else {}
+    response = client.get(f'/api/users/{user_id}', headers=headers)
+    if response.headers.get('ETag'):
+        state[user_id] = response.headers['ETag']
+    return response
+
+
+def contact_ingestion(client, rng, state, users):
+    return client.post('/api/contacts', json={
+        "name": "bench", "email": "bench@example.com", "message": "你好，我想詢問訂單。" * rng.randint(1, 20)
+    })
+
+
+def list_users(client, rng, state, users):
+    return client.get(f'/api/users?limit=50&after={rng.randint(0, max(users - 50, 0))}')
+
+
+def list_contacts(client, rng, state, users):
+    return client.get('/api/contacts?limit=50')
+
+
+def list_contacts_fields(client, rng, state, users):
+    return client.get('/api/contacts?limit=50&fields=id,name,created_at')
+
+
+SCENARIOS = {
+    func.__name__: func
+    for func in (login_storm, profile_polling, contact_ingestion, list_users, list_contacts, list_contacts_fields)
+}
+
+
+def run_scenario(app, scenario, threads, seconds, users, seed=0):
+    """以多個執行緒反覆執行情境直到時間結束"""
+    func = SCENARIOS[scenario]
+    latencies = []
+    statuses = Counter()
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def worker(index):
+        rng = random.Random(seed * 1000 + index)
+        client = app.test_client()
+        state = {}
+        local_latencies = []
+        local_statuses = Counter()
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                status = func(client, rng, state, users).status_code
+            except Exception:
+                status = 'exception'
+            local_latencies.append(time.perf_counter() - start)
+            local_statuses[status] += 1
+        with lock:
+            latencies.extend(local_latencies)
+            statuses.update(local_statuses)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    start = time.monotonic()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.monotonic() - start
+
+    ok = sum(count for status, count in statuses.items() if status == 304 or str(status).startswith('2'))
+    return {
+        "scenario": scenario,
+        **summarize(latencies, elapsed, errors=sum(statuses.values()) - ok),
+        "statuses": {str(status): count for status, count in sorted(statuses.items(), key=str)},
+    }
+
+
+def run(folder, users=1000, contacts=10000, threads=8, seconds=5, scenarios=None, profile='development'):
+    from app import create_app
+
+    app = create_app(make_profile('bench-load', os.path.join(folder, 'load.db'), base=PROFILES[profile]))
+    seed_dataset(app, users=users, contacts=contacts)
+    return [
+        run_scenario(app, scenario, threads, seconds, users)
+        for scenario in (scenarios or SCENARIOS)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--contacts', type=int, default=10000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--scenario', action='append', choices=list(SCENARIOS))
+    parser.add_argument('--profile', choices=list(PROFILES), default='development')
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        results = {
+            "environment": environment(),
+            "parameters": {k: v for k, v in vars(args).items() if k != 'output'},
+            "load": run(folder, args.users, args.contacts, args.threads, args.seconds, args.scenario, args.profile),
+        }
+
+    text = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == '__main__':
+    main()
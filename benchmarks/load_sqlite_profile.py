@@ -0,0 +1,88 @@
+"""
+比較預設 SQLite 設定與 ProductionConfig 資料庫設定在並行讀寫下的吞吐量
+
+    python -m benchmarks.load_sqlite_profile [--threads 16] [--seconds 5] [--write-ratio 0.2]
+
+每個執行緒以測試客戶端反覆呼叫 GET /api/contacts 與 POST /api/contacts，
+統計每秒完成的請求數與失敗數（例如 database is locked）。
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from config import DevelopmentConfig, ProductionConfig
+from app import create_app
+from app.database import db
+from app.migrations import upgrade_database
+from benchmarks.dataset import make_profile
+
+
+def run_profile(config_name, threads, seconds, write_ratio):
+    app = create_app(config_name)
+    # 正式環境配置不會在啟動時建立資料表（AUTO_MIGRATE 關閉）
+    with app.app_context():
+        db.create_all()
+        upgrade_database()
+    counters = {"ok": 0, "errors": 0}
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def worker(seed):
+        rng = random.Random(seed)
+        client = app.test_client()
+        ok = errors = 0
+        while time.monotonic() < deadline:
+            try:
+                if rng.random() < write_ratio:
+                    response = client.post('/api/contacts', json={
+                        "name": "bench", "email": "bench@example.com", "message": "x" * 200
+                    })
+                else:
+                    response = client.get('/api/contacts?limit=20')
+                if response.status_code < 400:
+                    ok += 1
+                else:
+                    errors += 1
+            except Exception:
+                errors += 1
+        with lock:
+            counters["ok"] += ok
+            counters["errors"] += errors
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    start = time.monotonic()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.monotonic() - start
+
+    return {
+        "profile": config_name,
+        "requests": counters["ok"],
+        "errors": counters["errors"],
+        "throughput_rps": round(counters["ok"] / elapsed, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--write-ratio', type=float, default=0.2)
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as folder:
+        for name, base in (('bench-default', DevelopmentConfig), ('bench-production', ProductionConfig)):
+            profile = make_profile(name, os.path.join(folder, name + '.db'), base)
+            results.append(run_profile(profile, args.threads, args.seconds, args.write_ratio))
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+熱點函數的微基準測試：resize_image、to_dict 序列化、密碼雜湊與驗證、API 權杖驗證
+
+    python -m benchmarks.micro [--iterations 200] [--hash-iterations 20] [--output micro.json]
+
+每個項目輸出單次呼叫的 p50/p90/p99 延遲與每秒次數。
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+from benchmarks.dataset import make_profile, seed_dataset, synthetic_avatar
+from benchmarks.stats import measure, environment
+
+
+def bench_resize(folder, iterations):
+    """resize_image：1200x900 JPEG 縮成 150x150"""
+    from app.utils.file_helpers import resize_image
+
+    source = os.path.join(folder, 'source.jpg')
+    with open(source, 'wb') as f:
+        f.write(synthetic_avatar(random.Random(0)))
+    output = os.path.join(folder, 'resized.jpg')
+    return {"resize_image": measure(lambda: resize_image(source, output), iterations)}
+
+
+def bench_to_dict(app, iterations):
+    """to_dict：每次序列化一頁（50 筆）已載入的資料"""
+    from app.models import User, ContactMessage
+
+    results = {}
+    with app.test_request_context():
+        for model in (User, ContactMessage):
+            items = model.query.limit(50).all()
+            results[f"{model.__name__}.to_dict_x50"] = measure(
+                lambda: [item.to_dict() for item in items], iterations
+            )
+    return results
+
+
+def bench_password(app, iterations):
+    """以目前的 PASSWORD_HASH_METHOD 雜湊與驗證"""
+    from app.services.password_hasher import password_hasher
+
+    with app.app_context():
+        pwhash = password_hasher.hash('bench-password')
+        return {
+            "password_hash": measure(lambda: password_hasher.hash('bench-password'), iterations),
+            "password_verify": measure(lambda: password_hasher.verify(pwhash, 'bench-password'), iterations),
+        }
+
+
+def bench_tokens(app, iterations):
+    """API 權杖：未快取時的簽章驗證與快取命中"""
+    from app.services.api_tokens import api_tokens
+
+    with app.app_context():
+        token, _ = api_tokens.issue(1)
+        return {
+            "api_token_verify_cold": measure(lambda: api_tokens._decode(token), iterations),
+            "api_token_verify_cached": measure(lambda: api_tokens.verify(token), iterations),
+        }
+
+
+def run(folder, iterations=200, hash_iterations=20):
+    from app import create_app
+
+    app = create_app(make_profile('bench-micro', os.path.join(folder, 'micro.db')))
+    seed_dataset(app, users=100, contacts=100)
+    return {
+        **bench_resize(folder, iterations),
+        **bench_to_dict(app, iterations),
+        **bench_password(app, hash_iterations),
+        **bench_tokens(app, iterations),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--hash-iterations', type=int, default=20)
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        results = {"environment": environment(), "micro": run(folder, args.iterations, args.hash_iterations)}
+
+    text = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == '__main__':
+    main()
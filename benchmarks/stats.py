@@ -0,0 +1,61 @@
+"""基準測試共用的統計與環境資訊"""
+import os
+import platform
+import subprocess
+import time
+
+
+def percentile(sorted_values, p):
+    """已排序數列的百分位數（nearest-rank）"""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(p * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies, elapsed, errors=0):
+    """
+    延遲（秒）列表轉成可比較的摘要
+    :param elapsed: 整段測試的牆鐘時間，用於計算吞吐量
+    """
+    values = sorted(latencies)
+    to_ms = lambda value: round(value * 1000, 3) if value is not None else None
+    return {
+        "count": len(values),
+        "errors": errors,
+        "throughput_per_s": round(len(values) / elapsed, 1) if elapsed else None,
+        "p50_ms": to_ms(percentile(values, 0.50)),
+        "p90_ms": to_ms(percentile(values, 0.90)),
+        "p99_ms": to_ms(percentile(values, 0.99)),
+        "max_ms": to_ms(values[-1] if values else None),
+    }
+
+
+def measure(func, iterations, warmup=1):
+    """重複執行 func，回傳 summarize() 結果"""
+    for _ in range(warmup):
+        func()
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        begin = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - begin)
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def environment():
+    """記錄執行環境，方便跨版本比較"""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    }
@@ -0,0 +1,91 @@
+"""
+完整基準測試：產生資料後執行微基準測試與負載情境，輸出 JSON
+
+    python -m benchmarks.suite [--users 1000] [--contacts 10000] [--avatars 20] [--threads 8] [--seconds 5]
+                               [--output results.json] [--baseline previous.json]
+
+指定 --baseline 時會在結果中加上 comparison：各項目 p50/p99 與吞吐量相對於基準的變化比例。
+"""
+import argparse
+import json
+import os
+import tempfile
+from benchmarks import micro, load
+from benchmarks.dataset import make_profile, seed_dataset
+from benchmarks.stats import environment
+
+COMPARED_KEYS = ('p50_ms', 'p99_ms', 'throughput_per_s')
+
+
+def flatten(results):
+    """{項目名稱: 摘要}，方便與基準比較"""
+    items = {f"micro.{name}": summary for name, summary in results.get("micro", {}).items()}
+    items.update({f"load.{summary['scenario']}": summary for summary in results.get("load", [])})
+    return items
+
+
+def compare(current, baseline):
+    """相對於基準的變化比例（0.1 表示增加 10%）"""
+    previous = flatten(baseline)
+    comparison = {}
+    for name, summary in flatten(current).items():
+        if name not in previous:
+            continue
+        comparison[name] = {
+            key: round(summary[key] / previous[name][key] - 1, 3)
+            for key in COMPARED_KEYS
+            if summary.get(key) is not None and previous[name].get(key)
+        }
+    return comparison
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--contacts', type=int, default=10000)
+    parser.add_argument('--avatars', type=int, default=20)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--hash-iterations', type=int, default=20)
+    parser.add_argument('--profile', choices=list(load.PROFILES), default='development')
+    parser.add_argument('--output')
+    parser.add_argument('--baseline')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        from app import create_app
+
+        app = create_app(make_profile(
+            'bench-suite', os.path.join(folder, 'suite.db'), base=load.PROFILES[args.profile]
+        ))
+        dataset = seed_dataset(app, args.users, args.contacts, args.avatars)
+        results = {
+            "environment": environment(),
+            "parameters": {k: v for k, v in vars(args).items() if k not in ('output', 'baseline')},
+            "dataset": dataset,
+            "micro": {
+                **micro.bench_resize(folder, args.iterations),
+                **micro.bench_to_dict(app, args.iterations),
+                **micro.bench_password(app, args.hash_iterations),
+                **micro.bench_tokens(app, args.iterations),
+            },
+            "load": [
+                load.run_scenario(app, scenario, args.threads, args.seconds, args.users)
+                for scenario in load.SCENARIOS
+            ],
+        }
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            results["comparison"] = compare(results, json.load(f))
+
+    text = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == '__main__':
+    main()
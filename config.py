@@ -1,28 +1,211 @@
 import os
 
+# 公開的預設密鑰，只適用於開發；非除錯模式下仍使用時拒絕啟動（見 ApiTokens.init_app）
+DEFAULT_SECRET_KEY = 'your-secret-key-here'
+
 class Config:
     """基礎配置類"""
-    SECRET_KEY = os.environ.get('SECRET_KEY') or 'your-secret-key-here'
+    SECRET_KEY = os.environ.get('SECRET_KEY') or DEFAULT_SECRET_KEY
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///flask_demo.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # 啟動時建立資料表並套用遷移；關閉時請在部署前執行 flask db-upgrade
+    AUTO_MIGRATE = os.environ.get('AUTO_MIGRATE') == '1'
+    SQLITE_PRAGMAS = {}  # 每個 SQLite 連線建立時執行的 PRAGMA
+
+    # 讀取副本：DATABASE_REPLICA_URLS 以逗號分隔，唯讀請求的查詢會送到其中一個副本
+    SQLALCHEMY_BINDS = {
+        f'replica_{index}': url.strip()
+        for index, url in enumerate(filter(None, os.environ.get('DATABASE_REPLICA_URLS', '').split(',')))
+    }
+    DB_REPLICAS = list(SQLALCHEMY_BINDS)
+    REPLICA_STICKY_SECONDS = 5  # 寫入後同一客戶端讀主庫的秒數，涵蓋副本延遲
+
     # 文件上傳配置
     UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB
+    UPLOAD_SPOOL_THRESHOLD = 4 * 1024 * 1024  # 小於此大小的上傳直接在記憶體中處理
+    UPLOAD_TEMP_MAX_AGE = 60 * 60  # 啟動時清理超過此秒數的殘留暫存檔
+
+    # 密碼雜湊設置（werkzeug 格式，例如 'scrypt:32768:8:1' 或 'pbkdf2:sha256:1000000'）
+    # 修改後，舊雜湊會在用戶下次登入成功時自動升級
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    PASSWORD_SALT_LENGTH = 16
+    PASSWORD_HASH_WORKERS = 4       # 同時計算雜湊的執行緒數，0 表示在請求執行緒中計算
+    PASSWORD_HASH_QUEUE_SIZE = 32   # 排隊中加上計算中的上限
+    PASSWORD_HASH_TIMEOUT = 5       # 等待名額與結果的秒數
+    PASSWORD_HASH_RETRY_AFTER = 2
+    PASSWORD_HASH_BULK_WORKERS = 1  # 批次創建用戶另用的執行緒數，不佔用上面登入與註冊的名額
+
+    # 響應壓縮設置（brotli 需要安裝選用依賴）
+    COMPRESS_ENABLED = True
+    COMPRESS_MIN_SIZE = 1024        # bytes，太小的響應壓縮不划算
+    COMPRESS_LEVEL = 6              # gzip
+    COMPRESS_BROTLI_QUALITY = 4     # brotli，動態內容用較低品質換速度
+    COMPRESS_MIMETYPES = {
+        'application/json', 'application/x-ndjson',
+        'text/html', 'text/css', 'text/javascript', 'application/javascript',
+    }
+
+    # 用戶資料快取設置
+    # 'lru' 只在本行程內有效：多個 worker 時，更新或刪除用戶後其他 worker 最多 USER_CACHE_TTL 秒內回傳舊資料
+    # 多個 worker 請使用 'shared' 並設定 CACHE_REDIS_URL（未共用時 gunicorn 啟動會記錄警告）
+    USER_CACHE_BACKEND = os.environ.get('USER_CACHE_BACKEND', 'lru')  # 'lru'（行程內）或 'shared'
+    USER_CACHE_TTL = 60
+    USER_CACHE_SIZE = 10000
+    # 未設定時 'shared' 使用本機替代品；設定後需要 pip install flask-demo[redis]
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL')
+
+    # 快取與檔案傳送設置
+    IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60  # uuid 檔名與帶版本的靜態文件
+    # 交給前端代理傳送檔案：nginx 設定 internal location 的前綴，例如 '/_protected_uploads/'
+    UPLOAD_X_ACCEL_REDIRECT = os.environ.get('UPLOAD_X_ACCEL_REDIRECT')
+    # Apache / lighttpd 使用 Flask 內建的 X-Sendfile 支援
+    USE_X_SENDFILE = os.environ.get('USE_X_SENDFILE') == '1'
 
     # 頭像設置
     AVATAR_FOLDER = os.path.join(UPLOAD_FOLDER, 'avatars')
     AVATAR_SIZE = (150, 150)
+    AVATAR_RENDITION_SIZES = (50, 150, 300)  # 列表頁 50px、個人頁 150px、高解析度 300px
+    AVATAR_FORMATS = ('webp', 'jpeg')        # jpeg 為預設格式，webp 依 Accept 提供
+    MAX_IMAGE_PIXELS = 50_000_000  # 依圖片標頭尺寸拒絕過大的圖片
+
+    # 背景圖片處理設置
+    IMAGE_WORKERS = int(os.environ.get('IMAGE_WORKERS', 2))
+    IMAGE_QUEUE_SIZE = 32       # 同時排隊或處理中的工作上限
+    # 工作狀態：'lru' 只在接收上傳的行程內可查詢，多個 worker 時須使用 'shared' 並設定 CACHE_REDIS_URL
+    IMAGE_JOB_BACKEND = os.environ.get('IMAGE_JOB_BACKEND', 'lru')
+    IMAGE_JOB_SIZE = 1000       # 保留的工作數（'lru'）
+    IMAGE_JOB_TTL = 60 * 60     # 工作結果保留秒數
+    IMAGE_RETRY_AFTER = 5       # 佇列已滿時建議的重試秒數
+
+    # 列表API分頁設置
+    API_PAGE_SIZE = 50
+    API_MAX_PAGE_SIZE = 500
+    API_STREAM_BATCH_SIZE = 1000
+
+    # 全文檢索設置
+    SEARCH_PAGE_SIZE = 20
+    SEARCH_MAX_PAGE = 50            # 限制 OFFSET 深度
+    SEARCH_MIN_TERM_LENGTH = 3      # SQLite trigram 分詞的最短搜尋詞，較短的詞改以 LIKE 比對
+
+    # 批次創建設置
+    BULK_MAX_ITEMS = 1000   # 單次請求的筆數上限
+    BULK_BATCH_SIZE = 500   # 每個交易寫入的筆數
+
+    # 聯絡訊息 write-behind 設置（啟用後訊息先進佇列，再由背景執行緒批次寫入）
+    CONTACT_WRITE_BEHIND = os.environ.get('CONTACT_WRITE_BEHIND') == '1'
+    CONTACT_BUFFER_SIZE = 10000     # 佇列上限，滿了改為同步寫入
+    CONTACT_FLUSH_BATCH = 500       # 每次寫入的最大筆數
+    CONTACT_FLUSH_INTERVAL = 0.2    # 收集一批的時間窗口（秒）
+
+    # 訊息頁面分頁設置
+    MESSAGES_PAGE_SIZE = 20
+    MESSAGES_MAX_PAGE_SIZE = 100
+
+    # 效能量測（/metrics、Server-Timing、慢查詢記錄）
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+    METRICS_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+    SERVER_TIMING_ENABLED = True
+    SLOW_QUERY_SECONDS = float(os.environ.get('SLOW_QUERY_SECONDS', 0.1))
+    # 可存取 /metrics 的來源 IP（逗號分隔），預設只允許本機；'*' 表示不限制
+    METRICS_ALLOWED_IPS = [
+        ip.strip() for ip in os.environ.get('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',') if ip.strip()
+    ]
+
+    # 非同步模式：/api/async 端點與 asyncio Session（需要 pip install flask-demo[async]）
+    ASYNC_ENABLED = os.environ.get('ASYNC_ENABLED') == '1'
+    ASYNC_DATABASE_URL = os.environ.get('ASYNC_DATABASE_URL')   # 留空時由 SQLALCHEMY_DATABASE_URI 推導
+
+    # 反向代理：信任的代理層數（例如前面有一層 nginx 時設為 1），0 表示不信任 X-Forwarded-* 標頭
+    # 設定後 request.remote_addr 為真實客戶端 IP，速率限制與 /metrics 的 IP 白名單才會依客戶端區分
+    PROXY_FIX_X_FOR = int(os.environ.get('PROXY_FIX_X_FOR', 0))
+    PROXY_FIX_X_PROTO = int(os.environ.get('PROXY_FIX_X_PROTO', 0))
+    PROXY_FIX_X_HOST = int(os.environ.get('PROXY_FIX_X_HOST', 0))
+
+    # 准入控制：昂貴端點依類別限制同時執行數（排隊已滿或逾時回 503），
+    # 並以權杖桶限制每個 IP 或用戶的請求速率（回 429）；未列出的端點不受限制
+    ADMISSION_ENABLED = os.environ.get('ADMISSION_ENABLED', '1') == '1'
+    RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', '1') == '1'
+    RATE_LIMIT_MAX_KEYS = 100000    # 最多追蹤的客戶端數
+    ADMISSION_CLASSES = {
+        # 圖片上傳：讀取與暫存上傳內容，縮圖另有 IMAGE_QUEUE_SIZE 限制
+        'image': {
+            'endpoints': ('api.upload_avatar', 'api_async.upload_avatar'),
+            'methods': ('POST',),
+            'concurrency': 4,       # 同時執行數
+            'queue': 8,             # 排隊上限
+            'queue_timeout': 0.5,   # 排隊最長秒數
+            'retry_after': 5,       # 503 的 Retry-After 秒數
+            'rate': 0.2,            # 每秒補充的權杖數
+            'burst': 5,             # 權杖桶容量
+            'key': 'user',          # 依 'ip' 或 'user'（已驗證的用戶，未認證時依 IP）限制
+        },
+        # 密碼雜湊：登入、註冊與建立用戶
+        'auth': {
+            'endpoints': (
+                'api.api_login', 'api.api_register', 'api.create_user', 'api.bulk_create_users',
+                'auth.login', 'auth.register',
+            ),
+            'methods': ('POST',),
+            'concurrency': 8,
+            'queue': 16,
+            'queue_timeout': 1.0,
+            'retry_after': 2,
+            'rate': 1,
+            'burst': 10,
+            'key': 'ip',
+        },
+    }
+
+    # API 權杖：HMAC 簽章的無狀態權杖，驗證時不查詢資料庫
+    # API_TOKEN_KEYS 格式為 'kid:secret,kid:secret'，第一把用於簽發，其餘只用於驗證（金鑰輪替）
+    # 留空時以 SECRET_KEY 衍生；非除錯模式下簽章密鑰仍是預設值時拒絕啟動
+    API_TOKEN_KEYS = [
+        tuple(item.strip().split(':', 1)) for item in os.environ.get('API_TOKEN_KEYS', '').split(',') if ':' in item
+    ]
+    API_TOKEN_TTL = int(os.environ.get('API_TOKEN_TTL', 60 * 60))   # 權杖有效秒數
+    API_TOKEN_CACHE_SIZE = 10000    # 已驗證權杖的行程內快取
+    API_TOKEN_CACHE_TTL = 60
+    # 撤銷的權杖（登出、修改密碼）：'lru' 只在本行程內有效，多個 worker 時須使用 'shared' 並設定 CACHE_REDIS_URL
+    # gunicorn 以多個 worker 啟動時會檢查，未共用時拒絕啟動（設為 0 則只記錄警告）
+    API_TOKEN_DENYLIST_BACKEND = os.environ.get('API_TOKEN_DENYLIST_BACKEND', 'lru')
+    API_TOKEN_REQUIRE_SHARED_DENYLIST = os.environ.get('API_TOKEN_REQUIRE_SHARED_DENYLIST', '1') == '1'
+    API_TOKEN_DENYLIST_SIZE = 100000
+    API_TOKEN_DENYLIST_TTL = API_TOKEN_TTL  # 項目保留到對應的權杖過期
+
+    # 用戶列表附帶訊息（?include=messages）時每位用戶的訊息數：未指定 messages_limit 時的預設值與上限
+    USER_MESSAGES_DEFAULT_LIMIT = 10
+    USER_MESSAGES_MAX_LIMIT = 100
 
 class DevelopmentConfig(Config):
     """開發環境配置"""
     DEBUG = True
+    AUTO_MIGRATE = True
 
 class ProductionConfig(Config):
     """生產環境配置"""
     DEBUG = False
 
+    # SQLite：WAL 讓讀寫可以並行，busy_timeout 避免立即回報 database is locked
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',    # WAL 模式下只在 checkpoint 時 fsync
+        'busy_timeout': 5000,       # 毫秒
+        'cache_size': -64000,       # 負數單位為 KiB，約 64MB
+        'mmap_size': 268435456,     # 256MB
+    }
+
+    # 連線池（PostgreSQL 等伺服器型資料庫）
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),
+        'pool_pre_ping': True,      # 取出連線前先確認連線仍有效
+        'pool_recycle': 1800,       # 秒，避免被資料庫或防火牆關閉的閒置連線
+        'pool_timeout': 10,
+    }
+
 config = {
     'development': DevelopmentConfig,
     'production': ProductionConfig,
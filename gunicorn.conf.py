@@ -0,0 +1,28 @@
+import os
+
+# gunicorn -c gunicorn.conf.py main:app
+# 部署前先執行 flask --app main db-upgrade，worker 啟動時不做結構變更
+bind = os.environ.get('BIND', '0.0.0.0:8000')
+# 預設單一 worker：權杖 denylist 與圖片工作狀態預設只存在行程內
+# 多個 worker（WEB_CONCURRENCY > 1）需要 pip install flask-demo[server,redis] 並設定
+#   CACHE_REDIS_URL=redis://...  API_TOKEN_DENYLIST_BACKEND=shared  IMAGE_JOB_BACKEND=shared
+# 否則 when_ready 會中止啟動；USER_CACHE_BACKEND=shared 也建議設定，未設定時只記錄警告
+workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# 在 master 載入應用，worker 以 copy-on-write 共用已載入的模組與資料
+preload_app = True
+
+
+def when_ready(server):
+    """master 載入應用後預熱（權杖 denylist 或圖片工作狀態未共用時以 RuntimeError 中止啟動）"""
+    from main import app
+    from app import preload
+    preload(app, server.cfg.workers)
+
+
+def post_fork(server, worker):
+    """worker 不可沿用 master 的資料庫連線"""
+    from main import app
+    from app import after_fork
+    after_fork(app)
@@ -22,6 +22,9 @@ document.addEventListener('DOMContentLoaded', function() {
   // 只在頭像上傳頁面執行
   if (!avatarForm) return;
 
+  // 以會話登入時，API 的寫入請求需要帶上 CSRF 權杖
+  const csrfToken = document.querySelector('meta[name="csrf-token"]').content;
+
   // 圖片預覽功能
   if (avatarInput) {
     avatarInput.addEventListener('change', function(e) {
@@ -53,6 +56,26 @@ document.addEventListener('DOMContentLoaded', function() {
     });
   }
 
+  // 輪詢背景工作狀態
+  function waitForJob(statusUrl) {
+    return fetch(statusUrl)
+      .then(response => response.json())
+      .then(data => {
+        if (!data.success) {
+          throw new Error(data.message);
+        }
+        const job = data.data;
+        if (job.status === 'done') {
+          return job;
+        }
+        if (job.status === 'failed') {
+          throw new Error(job.error);
+        }
+        return new Promise(resolve => setTimeout(resolve, 500))
+          .then(() => waitForJob(statusUrl));
+      });
+  }
+
   // 上傳表單提交
   if (avatarForm) {
     avatarForm.addEventListener('submit', function(e) {
@@ -75,24 +98,28 @@ document.addEventListener('DOMContentLoaded', function() {
       // 發送請求 (假設用戶ID為1，實際應該從會話獲取)
       fetch('/api/users/1/avatar', {
         method: 'POST',
+        headers: { 'X-CSRF-Token': csrfToken },
         body: formData
       })
       .then(response => response.json())
       .then(data => {
-        if (data.success) {
-          alert('頭像上傳成功！');
-          // 更新當前頭像顯示
-          currentAvatar.src = data.data.avatar_url + '?t=' + Date.now(); // 添加時間戳避免緩存
-          // 清空表單
-          avatarForm.reset();
-          previewContainer.style.display = 'none';
-        } else {
-          alert('上傳失敗：' + data.message);
+        if (!data.success) {
+          throw new Error(data.message);
         }
+        // 頭像在背景處理，輪詢工作狀態直到完成
+        return waitForJob(data.data.status_url);
+      })
+      .then(job => {
+        alert('頭像上傳成功！');
+        // 更新當前頭像顯示
+        currentAvatar.src = job.avatar_url + '?t=' + Date.now(); // 添加時間戳避免緩存
+        // 清空表單
+        avatarForm.reset();
+        previewContainer.style.display = 'none';
       })
       .catch(error => {
         console.error('Error:', error);
-        alert('上傳失敗，請重試');
+        alert('上傳失敗：' + (error.message || '請重試'));
       })
       .finally(() => {
         // 隱藏進度條，恢復按鈕
@@ -108,7 +135,8 @@ document.addEventListener('DOMContentLoaded', function() {
       if (!confirm('確定要刪除頭像嗎？')) return;
       
       fetch('/api/users/1/avatar', {
-        method: 'DELETE'
+        method: 'DELETE',
+        headers: { 'X-CSRF-Token': csrfToken }
       })
       .then(response => response.json())
       .then(data => {